@@ -4,15 +4,33 @@ from homeassistant.core import HomeAssistant
 from homeassistant.core_config import Config
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.components.sensor import DOMAIN as DOMAIN_SENSOR
+from homeassistant.helpers.storage import Store
 
-from .const import DOMAIN
-from .coordinator import LayerManagerCoordinator
+from .const import DOMAIN, DATA_ROUTER, STORAGE_KEY, STORAGE_VERSION
+from .coordinator import LayerManagerCoordinator, get_storage_key
+from .router import ServiceRouter
+from . import websocket_api
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [DOMAIN_SENSOR]
 
 async def async_setup(hass: HomeAssistant, config: Config):
+    router = hass.data[DATA_ROUTER] = ServiceRouter(hass)
+    router.async_setup_services()
+    websocket_api.async_setup(hass)
+    return True
+
+
+async def async_migrate_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
+    if config.version == 1 and config.minor_version < 2:
+        # Layers were kept in one store shared by the single allowed entry, move them to the entry's own store.
+        legacy_store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        if (stored_data := await legacy_store.async_load()) is not None:
+            await Store(hass, STORAGE_VERSION, get_storage_key(config.entry_id)).async_save(stored_data)
+            await legacy_store.async_remove()
+        hass.config_entries.async_update_entry(config, minor_version=2)
+
     return True
 
 
@@ -21,11 +39,11 @@ async def async_setup_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     await coordinator.async_load_from_store()
 
     hass.data.setdefault(DOMAIN, {})[config.entry_id] = coordinator
+    hass.data[DATA_ROUTER].async_register(coordinator)
 
     await hass.config_entries.async_forward_entry_setups(config, PLATFORMS)
     config.async_on_unload(config.add_update_listener(config_update_listener))
 
-    await coordinator.async_setup_services()
     await coordinator.async_setup_listeners()
     await coordinator.async_initial_refresh()
 
@@ -35,11 +53,16 @@ async def async_unload_entry(hass: HomeAssistant, config: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(config, PLATFORMS)
     if unload_ok:
         coordinator = hass.data[DOMAIN].pop(config.entry_id)
+        hass.data[DATA_ROUTER].async_unregister(coordinator)
         await coordinator.async_unload()
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, config: ConfigEntry) -> None:
+    await Store(hass, STORAGE_VERSION, get_storage_key(config.entry_id)).async_remove()
+
+
 async def config_update_listener(hass: HomeAssistant, config: ConfigEntry):
     coordinator = hass.data[DOMAIN][config.entry_id]
     await coordinator.async_options_updated()
@@ -1,13 +1,14 @@
 import logging
 from typing import Any, Dict
 import voluptuous as vol
-import time
+import copy
 
 from homeassistant import config_entries
 from homeassistant.components.sensor.const import DOMAIN as DOMAIN_SENSOR
 from homeassistant.components.number.const import DOMAIN as DOMAIN_NUMBER
 from homeassistant.components.input_number import DOMAIN as DOMAIN_INPUT_NUMBER
 from homeassistant.components.light.const import DOMAIN as DOMAIN_LIGHT
+from homeassistant.const import CONF_NAME
 from homeassistant.core import callback, split_entity_id
 from homeassistant.helpers import selector
 
@@ -27,7 +28,32 @@ from .const import (
     CONF_INPUT_BRIGHTNESS_MIN,
     CONF_INPUT_BRIGHTNESS_MAX,
     CONF_MIN_BRIGHTNESS,
-    CONF_MAX_BRIGHTNESS
+    CONF_MAX_BRIGHTNESS,
+    CONF_COMPACT_STATUS,
+    CONF_SOLAR_SCHEDULE,
+    CONF_COLOR_TEMP_STEP,
+    DEFAULT_COLOR_TEMP_STEP,
+    CONF_DISPATCH,
+    CONF_DISPATCH_CONCURRENCY,
+    CONF_DISPATCH_RATE,
+    CONF_DISPATCH_INTEGRATIONS,
+    CONF_DISPATCH_TIMEOUT,
+    DEFAULT_DISPATCH_CONCURRENCY,
+    DEFAULT_DISPATCH_RATE,
+    DEFAULT_DISPATCH_TIMEOUT,
+    CONF_LAYER_LIMITS,
+    CONF_MAX_ENTITY_LAYERS,
+    CONF_MAX_LAYERS,
+    CONF_EVICTION_POLICY,
+    EVICTION_LOWEST_PRIORITY,
+    EVICTION_POLICIES,
+    CONF_INPUT_SMOOTHING,
+    CONF_INPUT_SMOOTHING_WINDOW,
+    CONF_INPUT_MIN_INTERVAL,
+    CONF_INPUT_HYSTERESIS,
+    SMOOTHING_NONE,
+    SMOOTHING_METHODS,
+    DEFAULT_INPUT_SMOOTHING_WINDOW
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -35,15 +61,20 @@ _LOGGER = logging.getLogger(__name__)
 class LayerManagerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
+    MINOR_VERSION = 2
 
     async def async_step_user(self, user_input=None):
-        if self._async_current_entries():
-            return self.async_abort(reason="single_instance_allowed")
-
+        # Each entry is a zone owning its own set of managed entities.
         if user_input is not None:
-            return self.async_create_entry(title=DEFAULT_CONF_NAME, data={}, options={CONF_ENTITIES: {}})
+            return self.async_create_entry(title=user_input[CONF_NAME], data={}, options={CONF_ENTITIES: {}})
+
+        default_name = DEFAULT_CONF_NAME
+        if self._async_current_entries():
+            default_name = f"{DEFAULT_CONF_NAME} {len(self._async_current_entries()) + 1}"
 
-        return self.async_show_form(step_id="user")
+        return self.async_show_form(step_id="user", data_schema=vol.Schema({
+            vol.Required(CONF_NAME, default=default_name): str
+        }))
 
     @staticmethod
     @callback
@@ -61,33 +92,53 @@ class LayerManagerOptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_init(self, user_input=None):
         if not self.options:
-            self.options = dict(self.config_entry.options)
+            # Deep copy so nested entity settings are not modified in place, which would hide the change.
+            self.options = copy.deepcopy(dict(self.config_entry.options))
 
         return self.async_show_menu(
             step_id="init",
             menu_options=["manage_entities",
                           "select_advanced_entity",
-                          "global_adaptive_settings"],
+                          "global_adaptive_settings",
+                          "dispatch_settings",
+                          "layer_limits_settings",
+                          "status_settings"],
         )
 
     async def async_step_manage_entities(self, user_input=None):
+        errors = {}
+        placeholders = {}
 
         if user_input is not None:
 
             existing_entities_conf = self.config_entry.options.get(CONF_ENTITIES, {})
             new_entity_list = user_input.get(CONF_ENTITIES, [])
-            new_entities_conf = {
-                entity: existing_entities_conf.get(entity, {})
-                for entity in new_entity_list
+            other_zone_entities = {
+                entity_id
+                for entry in self.hass.config_entries.async_entries(DOMAIN) if entry.entry_id != self.config_entry.entry_id
+                for entity_id in entry.options.get(CONF_ENTITIES, {})
             }
 
-            self.options[CONF_ENTITIES] = new_entities_conf
-            return self.async_create_entry(title="", data=self.options)
+            if overlap := [e for e in new_entity_list if e in other_zone_entities]:
+                errors["base"] = "entity_in_other_zone"
+                placeholders["entities"] = ", ".join(overlap)
+
+            if not errors:
+                new_entities_conf = {
+                    entity: existing_entities_conf.get(entity, {})
+                    for entity in new_entity_list
+                }
+                self.options[CONF_ENTITIES] = new_entities_conf
+                return self.async_create_entry(title="", data=self.options)
 
         managed_entities = list(self.config_entry.options.get(CONF_ENTITIES, {}).keys())
+        if user_input is not None:
+            managed_entities = user_input.get(CONF_ENTITIES, [])
 
         return self.async_show_form(
             step_id="manage_entities",
+            errors=errors,
+            description_placeholders=placeholders,
             data_schema=vol.Schema({
                 vol.Optional(CONF_ENTITIES, default=managed_entities): selector.EntitySelector(
                     selector.EntitySelectorConfig(domain=SUPPORTED_DOMAINS, multiple=True)
@@ -131,7 +182,6 @@ class LayerManagerOptionsFlowHandler(config_entries.OptionsFlow):
             entity_conf[CONF_DEFAULT_STATE] = user_input.get(CONF_DEFAULT_STATE, None)
 
             self.options[CONF_ENTITIES][entity_id] = entity_conf
-            self.options["version"] = time.time() # Work around to make sure HASS reloads the config
 
             return self.async_create_entry(title="", data=self.options)
 
@@ -162,13 +212,100 @@ class LayerManagerOptionsFlowHandler(config_entries.OptionsFlow):
         schema = {
             vol.Optional(CONF_MIN_ELEVATION, default=adaptive_opts.get(CONF_MIN_ELEVATION, 0)): int,
             vol.Optional(CONF_MAX_ELEVATION, default=adaptive_opts.get(CONF_MAX_ELEVATION, 15)): int,
+            vol.Optional(CONF_SOLAR_SCHEDULE, default=adaptive_opts.get(CONF_SOLAR_SCHEDULE, False)): bool,
+            vol.Optional(CONF_COLOR_TEMP_STEP, default=adaptive_opts.get(CONF_COLOR_TEMP_STEP, DEFAULT_COLOR_TEMP_STEP)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=1, mode="box")),
             vol.Optional(CONF_ADAPTIVE_INPUT_ENTITIES, default=adaptive_opts.get(CONF_ADAPTIVE_INPUT_ENTITIES, [])):
-                selector.EntitySelector(selector.EntitySelectorConfig(multiple=True, domain=[DOMAIN_SENSOR, DOMAIN_NUMBER, DOMAIN_INPUT_NUMBER]))
+                selector.EntitySelector(selector.EntitySelectorConfig(multiple=True, domain=[DOMAIN_SENSOR, DOMAIN_NUMBER, DOMAIN_INPUT_NUMBER])),
+            vol.Optional(CONF_INPUT_SMOOTHING, default=adaptive_opts.get(CONF_INPUT_SMOOTHING, SMOOTHING_NONE)):
+                selector.SelectSelector(selector.SelectSelectorConfig(
+                    options=SMOOTHING_METHODS, translation_key=CONF_INPUT_SMOOTHING)),
+            vol.Optional(CONF_INPUT_SMOOTHING_WINDOW,
+                         default=adaptive_opts.get(CONF_INPUT_SMOOTHING_WINDOW, DEFAULT_INPUT_SMOOTHING_WINDOW)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=1, max=100, mode="box")),
+            vol.Optional(CONF_INPUT_MIN_INTERVAL, default=adaptive_opts.get(CONF_INPUT_MIN_INTERVAL, 0)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=0, step=0.1, mode="box")),
+            vol.Optional(CONF_INPUT_HYSTERESIS, default=adaptive_opts.get(CONF_INPUT_HYSTERESIS, 0)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=0, step="any", mode="box"))
         }
         schema.update(self._get_adaptive_schema(adaptive_opts, True))
 
         return self.async_show_form(step_id="global_adaptive_settings", data_schema=vol.Schema(schema), last_step=True)
 
+    async def async_step_dispatch_settings(self, user_input=None):
+        errors = {}
+
+        if user_input is not None:
+            if not self._valid_integration_limits(user_input.get(CONF_DISPATCH_INTEGRATIONS)):
+                errors[CONF_DISPATCH_INTEGRATIONS] = "invalid_integration_limits"
+            else:
+                self.options[CONF_DISPATCH] = user_input
+                return self.async_create_entry(title="", data=self.options)
+
+        dispatch_opts = user_input or self.options.get(CONF_DISPATCH, {})
+
+        schema = {
+            vol.Optional(CONF_DISPATCH_CONCURRENCY,
+                         default=dispatch_opts.get(CONF_DISPATCH_CONCURRENCY, DEFAULT_DISPATCH_CONCURRENCY)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=0, max=100, mode="box")),
+            vol.Optional(CONF_DISPATCH_RATE, default=dispatch_opts.get(CONF_DISPATCH_RATE, DEFAULT_DISPATCH_RATE)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=0, step=0.1, mode="box")),
+            vol.Optional(CONF_DISPATCH_TIMEOUT, default=dispatch_opts.get(CONF_DISPATCH_TIMEOUT, DEFAULT_DISPATCH_TIMEOUT)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=1, step=1, mode="box")),
+            vol.Optional(CONF_DISPATCH_INTEGRATIONS,
+                         description={"suggested_value": dispatch_opts.get(CONF_DISPATCH_INTEGRATIONS)}):
+                selector.ObjectSelector()
+        }
+
+        return self.async_show_form(step_id="dispatch_settings", data_schema=vol.Schema(schema), errors=errors,
+                                    last_step=True)
+
+    @staticmethod
+    def _valid_integration_limits(integrations: Any) -> bool:
+        if integrations is None:
+            return True
+        if not isinstance(integrations, dict):
+            return False
+
+        for limits in integrations.values():
+            if not isinstance(limits, dict) or set(limits) - {CONF_DISPATCH_CONCURRENCY, CONF_DISPATCH_RATE}:
+                return False
+            for value in limits.values():
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                    return False
+
+        return True
+
+    async def async_step_layer_limits_settings(self, user_input=None):
+        if user_input is not None:
+            self.options[CONF_LAYER_LIMITS] = user_input
+            return self.async_create_entry(title="", data=self.options)
+
+        limit_opts = self.options.get(CONF_LAYER_LIMITS, {})
+
+        schema = {
+            vol.Optional(CONF_MAX_ENTITY_LAYERS, default=limit_opts.get(CONF_MAX_ENTITY_LAYERS, 0)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=0, mode="box")),
+            vol.Optional(CONF_MAX_LAYERS, default=limit_opts.get(CONF_MAX_LAYERS, 0)):
+                selector.NumberSelector(selector.NumberSelectorConfig(min=0, mode="box")),
+            vol.Optional(CONF_EVICTION_POLICY, default=limit_opts.get(CONF_EVICTION_POLICY, EVICTION_LOWEST_PRIORITY)):
+                selector.SelectSelector(selector.SelectSelectorConfig(
+                    options=EVICTION_POLICIES, translation_key=CONF_EVICTION_POLICY))
+        }
+
+        return self.async_show_form(step_id="layer_limits_settings", data_schema=vol.Schema(schema), last_step=True)
+
+    async def async_step_status_settings(self, user_input=None):
+        if user_input is not None:
+            self.options[CONF_COMPACT_STATUS] = user_input.get(CONF_COMPACT_STATUS, False)
+            return self.async_create_entry(title="", data=self.options)
+
+        schema = {
+            vol.Optional(CONF_COMPACT_STATUS, default=self.options.get(CONF_COMPACT_STATUS, False)): bool
+        }
+
+        return self.async_show_form(step_id="status_settings", data_schema=vol.Schema(schema), last_step=True)
+
     def _get_adaptive_schema(self, options: Dict[str, Any] = None, root_config=False) -> Dict:
         options = options or {}
 
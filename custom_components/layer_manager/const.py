@@ -25,12 +25,25 @@ SERVICE_REFRESH_ALL = "refresh_all"
 SERVICE_REFRESH = "refresh"
 SERVICE_ADD_ADAPTIVE = "add_adaptive"
 SERVICE_REMOVE_ADAPTIVE = "remove_adaptive"
+SERVICE_GET_SUMMARY = "get_summary"
+SERVICE_START_PROFILE = "start_profile"
+SERVICE_STOP_PROFILE = "stop_profile"
+SERVICE_START_TRACE = "start_trace"
+SERVICE_STOP_TRACE = "stop_trace"
 
 ATTR_PRIORITY = "priority"
 ATTR_ATTRIBUTES = "attributes"
 ATTR_CLEAR_LAYER = "clear_layer"
+ATTR_CLEAR_PATTERN = "clear_pattern"
+ATTR_MATCH = "match"
+ATTR_LAYER_ID = "layer_id"
 ATTR_COLOR = "color"
 ATTR_COLOR_TEMP = "color_temp"
+ATTR_DURATION = "duration"
+ATTR_CALLS = "calls"
+ATTR_TOP = "top"
+ATTR_EXCLUDED = "excluded"
+ATTR_INSERTED = "inserted"
 
 CONF_ENTITIES = "entities"
 CONF_ADAPTIVE = "adaptive"
@@ -45,11 +58,68 @@ CONF_INPUT_BRIGHTNESS_MAX = "input_brightness_max"
 CONF_INPUT_BRIGHTNESS_MIN = "input_brightness_min"
 CONF_INPUT_BRIGHTNESS_ENTITY = "input_brightness_entity"
 CONF_DEFAULT_STATE = "default_state"
+CONF_SOLAR_SCHEDULE = "solar_schedule"
+CONF_COLOR_TEMP_STEP = "color_temp_step"
+CONF_INPUT_SMOOTHING = "input_smoothing"
+CONF_INPUT_SMOOTHING_WINDOW = "input_smoothing_window"
+CONF_INPUT_MIN_INTERVAL = "input_min_interval"
+CONF_INPUT_HYSTERESIS = "input_hysteresis"
+CONF_COMPACT_STATUS = "compact_status"
+CONF_DISPATCH = "dispatch"
+CONF_DISPATCH_CONCURRENCY = "concurrency"
+CONF_DISPATCH_RATE = "rate"
+CONF_DISPATCH_INTEGRATIONS = "integrations"
+CONF_DISPATCH_TIMEOUT = "timeout"
+CONF_LAYER_LIMITS = "layer_limits"
+CONF_MAX_ENTITY_LAYERS = "max_entity_layers"
+CONF_MAX_LAYERS = "max_layers"
+CONF_EVICTION_POLICY = "eviction_policy"
+
+EVICTION_LOWEST_PRIORITY = "lowest_priority"
+EVICTION_OLDEST = "oldest"
+EVICTION_POLICIES = [EVICTION_LOWEST_PRIORITY, EVICTION_OLDEST]
+
+MATCH_EXACT = "exact"
+MATCH_GLOB = "glob"
+MATCH_MODES = [MATCH_EXACT, MATCH_GLOB]
+
+SMOOTHING_NONE = "none"
+SMOOTHING_EMA = "ema"
+SMOOTHING_MEDIAN = "median"
+SMOOTHING_METHODS = [SMOOTHING_NONE, SMOOTHING_EMA, SMOOTHING_MEDIAN]
 
 SUPPORTED_DOMAINS = [
     DOMAIN_LIGHT, DOMAIN_COVER, DOMAIN_NUMBER, DOMAIN_SELECT, DOMAIN_INPUT_BOOLEAN, DOMAIN_INPUT_NUMBER, DOMAIN_SWITCH, DOMAIN_INPUT_SELECT
 ]
 
 DEFAULT_CONF_NAME = "Layer Manager"
+DEFAULT_DISPATCH_CONCURRENCY = 0
+DEFAULT_DISPATCH_RATE = 0.0
+DEFAULT_DISPATCH_TIMEOUT = 30.0
+DEFAULT_COLOR_TEMP_STEP = 50
+DEFAULT_SOLAR_SCHEDULE_STEPS = 20
+DEFAULT_INPUT_SMOOTHING_WINDOW = 5
+
+# Lower bounds of the priority bands reported by the compact status digest.
+PRIORITY_BANDS = [0, 10, 50, 100]
+
+# Integrations whose entities only live inside Home Assistant and can be updated without pacing
+# unless explicitly configured otherwise.
+UNPACED_INTEGRATIONS = [
+    DOMAIN_INPUT_BOOLEAN, DOMAIN_INPUT_NUMBER, DOMAIN_INPUT_SELECT, "group", "template"
+]
+
+DATA_ROUTER = f"{DOMAIN}_router"
 
 SIGNAL_DATA_UPDATE = f"{DOMAIN}-data-changed"
+SIGNAL_LAYER_DELTA = f"{DOMAIN}-layer-delta"
+
+DELTA_LAYER_ADDED = "layer_added"
+DELTA_LAYER_REMOVED = "layer_removed"
+DELTA_WINNING_LAYER_CHANGED = "winning_layer_changed"
+DELTA_ADAPTIVE_ADDED = "adaptive_added"
+DELTA_ADAPTIVE_REMOVED = "adaptive_removed"
+DELTA_ADAPTIVE_CHANGED = "adaptive_changed"
+
+WS_TYPE_LAYERS = f"{DOMAIN}/layers"
+WS_TYPE_SUBSCRIBE = f"{DOMAIN}/subscribe"
@@ -1,8 +1,16 @@
+from bisect import bisect_right
+from contextlib import contextmanager
+import copy
 from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import partial
+import heapq
+from itertools import chain
 import logging
+import math
 import voluptuous as vol
 
-from typing import Any, Dict, List, cast
+from typing import Any, Dict, Iterable, List
 
 from homeassistant.const import (
     ATTR_ENTITY_ID,
@@ -14,7 +22,8 @@ from homeassistant.const import (
     STATE_UNAVAILABLE,
     STATE_UNKNOWN
 )
-from homeassistant.core import Context, Event, HomeAssistant, ServiceCall, State, callback, split_entity_id
+from homeassistant.core import (Context, Event, HomeAssistant, ServiceCall, ServiceResponse, State,
+                                callback, split_entity_id)
 from homeassistant.components.group import DOMAIN as DOMAIN_GROUP, get_entity_ids
 from homeassistant.components.number import DOMAIN as DOMAIN_NUMBER
 from homeassistant.components.cover import (DOMAIN as DOMAIN_COVER, CoverState,
@@ -28,27 +37,45 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import ATTR_ELEVATION, SERVICE_SET_COVER_TILT_POSITION, SERVICE_OPEN_COVER, SERVICE_CLOSE_COVER
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.dispatcher import async_dispatcher_send
-from homeassistant.helpers.event import async_track_state_change_filtered, TrackStates
-from homeassistant.helpers.state import async_reproduce_state
+from homeassistant.helpers.event import (async_call_later, async_track_point_in_utc_time,
+                                         async_track_state_change_filtered, TrackStates)
 from homeassistant.helpers.storage import Store
+from homeassistant.helpers.sun import get_astral_location
+import homeassistant.util.dt as dt_util
 
-from .const import (DOMAIN, SIGNAL_DATA_UPDATE, SUPPORTED_DOMAINS, STORAGE_VERSION, STORAGE_KEY,
-                    ATTR_PRIORITY, ATTR_CLEAR_LAYER, ATTR_COLOR, ATTR_ATTRIBUTES, ATTR_COLOR_TEMP,
+from .const import (DOMAIN, DATA_ROUTER, SIGNAL_DATA_UPDATE, SIGNAL_LAYER_DELTA, SUPPORTED_DOMAINS, STORAGE_VERSION, STORAGE_KEY,
+                    ATTR_PRIORITY, ATTR_CLEAR_LAYER, ATTR_CLEAR_PATTERN, ATTR_COLOR, ATTR_ATTRIBUTES, ATTR_COLOR_TEMP,
                     CONF_ADAPTIVE, CONF_MAX_COLOR_TEMP, CONF_MIN_COLOR_TEMP, CONF_MIN_BRIGHTNESS,
                     CONF_MAX_BRIGHTNESS, CONF_INPUT_BRIGHTNESS_MAX, CONF_INPUT_BRIGHTNESS_MIN,
                     CONF_INPUT_BRIGHTNESS_ENTITY, CONF_ADAPTIVE_INPUT_ENTITIES, CONF_DEFAULT_STATE,
-                    CONF_MIN_ELEVATION, CONF_MAX_ELEVATION,
-                    SERVICE_INSERT_SCENE, SERVICE_INSERT_STATE, SERVICE_REMOVE_LAYER, SERVICE_ADD_ADAPTIVE,
-                    SERVICE_REMOVE_ALL_LAYERS, SERVICE_REMOVE_ADAPTIVE, SERVICE_REFRESH, SERVICE_REFRESH_ALL)
+                    CONF_MIN_ELEVATION, CONF_MAX_ELEVATION, PRIORITY_BANDS,
+                    DELTA_LAYER_ADDED, DELTA_LAYER_REMOVED, DELTA_WINNING_LAYER_CHANGED, DELTA_ADAPTIVE_ADDED,
+                    DELTA_ADAPTIVE_REMOVED, DELTA_ADAPTIVE_CHANGED, CONF_SOLAR_SCHEDULE, CONF_COLOR_TEMP_STEP,
+                    DEFAULT_COLOR_TEMP_STEP, DEFAULT_SOLAR_SCHEDULE_STEPS, ATTR_DURATION,
+                    ATTR_CALLS, ATTR_TOP, ATTR_EXCLUDED, ATTR_INSERTED,
+                    CONF_LAYER_LIMITS, CONF_MAX_ENTITY_LAYERS, CONF_MAX_LAYERS, CONF_EVICTION_POLICY,
+                    EVICTION_LOWEST_PRIORITY, EVICTION_OLDEST, CONF_INPUT_SMOOTHING, CONF_INPUT_SMOOTHING_WINDOW,
+                    CONF_INPUT_MIN_INTERVAL, CONF_INPUT_HYSTERESIS, SMOOTHING_NONE, DEFAULT_INPUT_SMOOTHING_WINDOW,
+                    ATTR_MATCH, MATCH_EXACT, MATCH_GLOB, MATCH_MODES)
+from .dispatch import DispatchItem, DispatchScheduler
+from .layer_index import LayerIndex
+from .profiler import HotPathProfiler, profile_hot_path
+from .smoothing import InputSmoother, apply_bound_hysteresis
+from .solar import compute_factor_schedule, get_elevation_factor
+from .trace import TraceRecorder, record_service_call
 
 _LOGGER = logging.getLogger(__name__)
 
+SOLAR_SCHEDULE_DURATION = timedelta(days=1)
+INPUT_OPTIONS = (CONF_INPUT_SMOOTHING, CONF_INPUT_SMOOTHING_WINDOW, CONF_INPUT_MIN_INTERVAL, CONF_INPUT_HYSTERESIS)
+
 SERVICE_INSERT_SCENE_SCHEMA = vol.Schema(
     {
         vol.Required(ATTR_ENTITY_ID): cv.entity_domain(DOMAIN_SCENE),
         vol.Required(ATTR_ID): cv.string,
         vol.Required(ATTR_PRIORITY): cv.positive_int,
         vol.Optional(ATTR_CLEAR_LAYER): cv.boolean,
+        vol.Optional(ATTR_CLEAR_PATTERN): cv.string,
         vol.Optional(ATTR_COLOR):  vol.Coerce(tuple)
     }
 )
@@ -60,12 +87,17 @@ SERVICE_INSERT_STATE_SCHEMA = vol.Schema(
         vol.Required(ATTR_ID): cv.string,
         vol.Optional(ATTR_STATE): cv.string,
         vol.Optional(ATTR_ATTRIBUTES): dict,
-        vol.Optional(ATTR_CLEAR_LAYER): cv.boolean
+        vol.Optional(ATTR_CLEAR_LAYER): cv.boolean,
+        vol.Optional(ATTR_CLEAR_PATTERN): cv.string
     }
 )
 
 SERVICE_REMOVE_LAYER_SCHEMA = vol.Schema(
-    {vol.Optional(ATTR_ENTITY_ID): cv.entity_domain(SUPPORTED_DOMAINS + [DOMAIN_GROUP]), vol.Required(ATTR_ID): cv.string}
+    {
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_domain(SUPPORTED_DOMAINS + [DOMAIN_GROUP]),
+        vol.Required(ATTR_ID): cv.string,
+        vol.Optional(ATTR_MATCH, default=MATCH_EXACT): vol.In(MATCH_MODES)
+    }
 )
 
 SERVICE_REFRESH_SCHEMA = vol.Schema({vol.Required(ATTR_ENTITY_ID): cv.entity_domain(SUPPORTED_DOMAINS + [DOMAIN_GROUP])})
@@ -81,6 +113,17 @@ SERVICE_ADD_ADAPTIVE_SCHEMA = vol.Schema(
 SERVICE_REMOVE_ADAPTIVE_SCHEMA = vol.Schema(
     {vol.Required(ATTR_ENTITY_ID): cv.entity_domain([DOMAIN_LIGHT, DOMAIN_GROUP])})
 
+SERVICE_START_PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=300): vol.All(vol.Coerce(float), vol.Range(min=1, max=3600)),
+        vol.Optional(ATTR_CALLS): cv.positive_int,
+        vol.Optional(ATTR_TOP, default=20): cv.positive_int,
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_id
+    }
+)
+
+SERVICE_ZONE_SCHEMA = vol.Schema({vol.Optional(ATTR_ENTITY_ID): cv.entity_id})
+
 
 @dataclass
 class AdaptiveProperties:
@@ -96,55 +139,179 @@ class AdaptiveProperties:
     color_temp_max: int | None
 
 
+@dataclass
+class EntityMetadata:
+    domain: str
+    default_state: str | None
+    adaptive_config: Dict[str, Any]
+
+
 class LayerManagerCoordinator:
     def __init__(self, hass: HomeAssistant, config: ConfigEntry):
         self.hass = hass
         self.config = config
+        self.data_update_signal = f"{SIGNAL_DATA_UPDATE}-{config.entry_id}"
         self.managed_entities: List[str] = []
         self.entity_states: Dict[str, Dict[str, Dict]] = {}
+        self.group_states: Dict[str, Dict[str, Dict]] = {}
+        self._group_members: Dict[str, List[str]] = {}
+        self._entity_groups: Dict[str, set] = {}
+        self._group_track_states_remover = None
+        self._layer_index = LayerIndex()
+        self._max_entity_layers = 0
+        self._max_layers = 0
+        self._eviction_policy = EVICTION_LOWEST_PRIORITY
+        self._evicted_layers = 0
+        self._input_smoothers: Dict[str, InputSmoother] = {}
+        self._unsub_input_updates: Dict[str, Any] = {}
+        self._input_hysteresis = 0.0
+        self._bounded_inputs: Dict[str, float] = {}
         self.adaptive_entities: Dict[str, AdaptiveProperties] = {}
+        self._entity_metadata: Dict[str, EntityMetadata] = {}
+        self._global_adaptive_config: Dict[str, Any] = {}
+        self._winning_layers: Dict[str, str | None] = {}
+        self._adaptive_values: Dict[str, Dict[str, Any]] = {}
         self._unsub_listeners = []
-        self._store = Store[Dict[str, Any]](hass, STORAGE_VERSION, STORAGE_KEY)
+        self._store = Store[Dict[str, Any]](hass, STORAGE_VERSION, get_storage_key(config.entry_id))
         self._adaptive_track_states_remover = None
+        self._adaptive_tracked: set = set()
+        self._adaptive_track_added: set = set()
+        self._adaptive_track_removed: set = set()
+        self._adaptive_track_batch_depth = 0
+        self._input_track_states_remover = None
+        self._managed_track_states_remover = None
+        self._loaded_options: Dict[str, Any] = {}
         self._adaptive_color_temp_factor: float = 0.0
+        self._solar_schedule: List[tuple[datetime, float]] = []
+        self._solar_schedule_end: datetime | None = None
+        self._unsub_solar_schedule = None
+        self._solar_schedule_generation = 0
+        self._dispatcher = DispatchScheduler(hass, config)
+        self._profiler = HotPathProfiler(hass)
+        self._trace_recorder = TraceRecorder(hass)
+        self._router = hass.data[DATA_ROUTER]
 
         self._load_options()
 
     def _load_options(self):
+        self._dispatcher.load_options()
         self.managed_entities = self.config.options.get(CONF_ENTITIES, {})
         for entity_id in list(self.managed_entities.keys()):
             self.entity_states.setdefault(entity_id, {})
 
-        for entity_id in list(self.entity_states.keys()):
-            if entity_id not in self.managed_entities:
-                del self.entity_states[entity_id]
-                if entity_id in self.adaptive_entities:
-                    del self.adaptive_entities[entity_id]
+        limit_opts = self.config.options.get(CONF_LAYER_LIMITS, {})
+        self._max_entity_layers = int(limit_opts.get(CONF_MAX_ENTITY_LAYERS) or 0)
+        self._max_layers = int(limit_opts.get(CONF_MAX_LAYERS) or 0)
+        self._eviction_policy = limit_opts.get(CONF_EVICTION_POLICY, EVICTION_LOWEST_PRIORITY)
+
+        adaptive_opts = self.config.options.get(CONF_ADAPTIVE, {})
+        self._global_adaptive_config = _merge_adaptive_config(adaptive_opts, {})
+
+        # Smoothed input history is only dropped when the settings it was built with change.
+        previous_adaptive_opts = self._loaded_options.get(CONF_ADAPTIVE, {})
+        if any(previous_adaptive_opts.get(key) != adaptive_opts.get(key) for key in INPUT_OPTIONS):
+            self._cancel_input_updates()
+            self._input_smoothers.clear()
+            self._bounded_inputs.clear()
+        self._input_hysteresis = float(adaptive_opts.get(CONF_INPUT_HYSTERESIS) or 0)
+        self._entity_metadata = {
+            entity_id: self._build_entity_metadata(entity_id, entity_conf or {}, adaptive_opts)
+            for entity_id, entity_conf in self.managed_entities.items()
+        }
+
+        removed_entities = [e for e in self.entity_states if e not in self.managed_entities]
+        for entity_id in removed_entities:
+            for layer_id in list(self.entity_states[entity_id].keys()):
+                self._pop_layer(entity_id, layer_id)
+            del self.entity_states[entity_id]
+            self._winning_layers.pop(entity_id, None)
+        self._remove_entities_from_adaptive_track(removed_entities)
+
+        # Keep a private copy so the next options update can be diffed against it.
+        self._loaded_options = copy.deepcopy(dict(self.config.options))
+
+    def _build_entity_metadata(self, entity_id: str, entity_conf: Dict[str, Any],
+                               adaptive_opts: Dict[str, Any]) -> EntityMetadata:
+        domain = split_entity_id(entity_id)[0]
+        return EntityMetadata(
+            domain=domain,
+            default_state=entity_conf.get(CONF_DEFAULT_STATE, None) or get_domain_default_state(domain),
+            adaptive_config=_merge_adaptive_config(adaptive_opts, entity_conf.get(CONF_ADAPTIVE) or {})
+        )
+
+    def _get_domain(self, entity_id: str) -> str:
+        if meta := self._entity_metadata.get(entity_id):
+            return meta.domain
+        return split_entity_id(entity_id)[0]
 
     async def async_options_updated(self):
+        previous_options = self._loaded_options
+        previous_entities = previous_options.get(CONF_ENTITIES, {})
         self._load_options()
-        await self.async_setup_listeners()
-        await self.async_initial_refresh()
+        self._router.async_update_zones()
+
+        added_entities = [e for e in self.managed_entities if e not in previous_entities]
+        removed_entities = [e for e in previous_entities if e not in self.managed_entities]
+        changed_entities = [e for e in self.managed_entities
+                            if e in previous_entities and previous_entities[e] != self.managed_entities[e]]
+
+        previous_adaptive_opts = previous_options.get(CONF_ADAPTIVE, {})
+        adaptive_opts = self.config.options.get(CONF_ADAPTIVE, {})
+
+        if added_entities or removed_entities:
+            self._managed_track_states_remover.async_update_listeners(
+                TrackStates(False, set(self.managed_entities), None))
+
+        if previous_adaptive_opts.get(CONF_ADAPTIVE_INPUT_ENTITIES) != adaptive_opts.get(CONF_ADAPTIVE_INPUT_ENTITIES):
+            self._input_track_states_remover.async_update_listeners(
+                TrackStates(False, set(adaptive_opts.get(CONF_ADAPTIVE_INPUT_ENTITIES, [])), None))
+
+        entities_to_render = added_entities + changed_entities
+        if previous_options.get(CONF_LAYER_LIMITS) != self.config.options.get(CONF_LAYER_LIMITS):
+            evicted_entities = self._evict_layers(chain(self.entity_states, self.group_states))
+            entities_to_render.extend(e for e in evicted_entities if e not in entities_to_render)
+            self._schedule_save()
+        if previous_adaptive_opts != adaptive_opts or changed_entities:
+            await self._async_update_color_temp_source()
+        if previous_adaptive_opts != adaptive_opts:
+            entities_to_render.extend(e for e in self.adaptive_entities if e not in entities_to_render)
+
+        if entities_to_render:
+            await self._apply_entities(entities_to_render, [], None)
+
+        async_dispatcher_send(self.hass, self.data_update_signal)
 
     async def async_initial_refresh(self):
         await self._apply_entities(self.managed_entities, [], None)
-        async_dispatcher_send(self.hass, SIGNAL_DATA_UPDATE)
+        async_dispatcher_send(self.hass, self.data_update_signal)
 
     async def async_load_from_store(self):
         stored_data = await self._store.async_load()
         if stored_data:
-            # Load Layers
+            # Layers stored before insertion times were recorded count as inserted now.
+            loaded_at = dt_util.utcnow().timestamp()
+
+            # Load Layers. The stored layers are kept as they are, their states are only built once a layer
+            # wins or is queried.
             for entity_id, layers, in stored_data.get("states", {}).items():
-                self.entity_states[entity_id] = {}
+                self.entity_states[entity_id] = layers
                 for layer_id, data in layers.items():
-                    state_info = data.get(ATTR_STATE, {})
-                    reconstructed_state = State(state_info.get("entity_id", entity_id),
-                                                state_info.get("state"),
-                                                state_info.get("attributes"))
-                    self.entity_states[entity_id][layer_id] = {
+                    if not data.get(ATTR_INSERTED):
+                        data[ATTR_INSERTED] = loaded_at
+                    self._layer_index.add(layer_id, entity_id)
+
+            # Load group layers, membership is resolved once the groups are available.
+            for group_id, layers in stored_data.get("group_states", {}).items():
+                self.group_states[group_id] = {}
+                for layer_id, data in layers.items():
+                    self.group_states[group_id][layer_id] = {
                         ATTR_PRIORITY: data.get(ATTR_PRIORITY),
-                        ATTR_STATE: reconstructed_state
+                        ATTR_STATE: {"entity_id": group_id, **data.get(ATTR_STATE, {})},
+                        ATTR_INSERTED: data.get(ATTR_INSERTED) or loaded_at,
+                        ATTR_EXCLUDED: set(data.get(ATTR_EXCLUDED, []))
                     }
+                    self._layer_index.add(layer_id, group_id)
+                self._index_group(group_id)
 
     def _schedule_save(self):
         serialized_states = {}
@@ -152,40 +319,54 @@ class LayerManagerCoordinator:
             if entity_id not in self.managed_entities: continue
             serialized_states[entity_id] = {}
             for layer_id, data in layers.items():
-                state_obj = cast(State, data.get(ATTR_STATE))
                 serialized_states[entity_id][layer_id] = {
                     ATTR_PRIORITY: data.get(ATTR_PRIORITY),
-                    ATTR_STATE: {
-                        "entity_id": state_obj.entity_id,
-                        "state": state_obj.state,
-                        "attributes": dict(state_obj.attributes)
-                    }
+                    ATTR_STATE: serialize_layer_state(data[ATTR_STATE]),
+                    ATTR_INSERTED: data[ATTR_INSERTED]
                 }
 
-        async_dispatcher_send(self.hass, SIGNAL_DATA_UPDATE)
+        serialized_group_states = {
+            group_id: {
+                layer_id: {
+                    ATTR_PRIORITY: data.get(ATTR_PRIORITY),
+                    ATTR_STATE: serialize_layer_state(data[ATTR_STATE]),
+                    ATTR_INSERTED: data[ATTR_INSERTED],
+                    ATTR_EXCLUDED: sorted(data[ATTR_EXCLUDED])
+                }
+                for layer_id, data in layers.items()
+            }
+            for group_id, layers in self.group_states.items()
+        }
+
+        async_dispatcher_send(self.hass, self.data_update_signal)
         self._store.async_delay_save(lambda: {
-            "states": serialized_states
+            "states": serialized_states,
+            "group_states": serialized_group_states
         }, 1)
 
-    async def insert_scene(self, call: ServiceCall):
+    @record_service_call
+    @profile_hot_path
+    async def insert_scene(self, call: ServiceCall, targets: List[str] | None = None):
         scene_entity_id = call.data.get(ATTR_ENTITY_ID)
         layer_id = call.data.get(ATTR_ID)
         priority = call.data.get(ATTR_PRIORITY)
         should_clear = call.data.get(ATTR_CLEAR_LAYER)
+        clear_pattern = call.data.get(ATTR_CLEAR_PATTERN)
         color = call.data.get(ATTR_COLOR)
 
         scene_entity = self.hass.data.get(DATA_HA_SCENE, {}).get_entity(scene_entity_id)
         if not scene_entity: _LOGGER.error("Scene %s not found", scene_entity_id); return
 
         entity_states = scene_entity.scene_config.states
+        if targets is None:
+            targets = expand_entity_ids(self.hass, entity_states)
         ungrouped_entity_states = {}
+        group_entity_states = {}
 
         # Split out groups
         for entity_id, state in entity_states.items():
             if split_entity_id(entity_id)[0] == DOMAIN_GROUP:
-                for group_entity in get_entity_ids(self.hass, entity_id):
-                    ungrouped_entity_states[group_entity] = self._handle_replacements(
-                        group_entity, state, color=color)
+                group_entity_states[entity_id] = self._handle_replacements(entity_id, state, color=color)
             else:
                 ungrouped_entity_states[entity_id] = self._handle_replacements(
                     entity_id, state, color=color)
@@ -194,153 +375,431 @@ class LayerManagerCoordinator:
         affected_entities = []
 
         if should_clear: affected_entities.extend(self._clear_layer(layer_id))
+        if clear_pattern:
+            affected_entities.extend(e for e in self._clear_layer(clear_pattern, True) if e not in affected_entities)
+        for group_id, state in group_entity_states.items():
+            self._set_group_layer(group_id, layer_id, priority, state)
+
+        zone_entities = self._get_zone_entities(targets)
+
+        for group_id, state in group_entity_states.items():
+            for member_id in get_entity_ids(self.hass, group_id):
+                if member_id in self.managed_entities:
+                    if member_id not in affected_entities:
+                        affected_entities.append(member_id)
+                elif member_id not in ungrouped_entity_states and member_id in zone_entities:
+                    non_managed_entities.append(self._resolve_layer_state(member_id, state))
+
         for entity_id, state in ungrouped_entity_states.items():
             if entity_id in self.managed_entities:
-                self.entity_states.setdefault(entity_id, {})[layer_id] = {
-                    ATTR_PRIORITY: priority,
-                    ATTR_STATE: state
-                }
+                self._set_layer(entity_id, layer_id, priority, state)
                 if entity_id not in affected_entities:
                     affected_entities.append(entity_id)
-            else:
+            elif entity_id in zone_entities:
                 non_managed_entities.append(state)
 
-        await self._apply_entities(affected_entities, non_managed_entities, call.context)
+        evicted_entities = self._evict_layers(chain(group_entity_states, affected_entities), layer_id)
+        affected_entities.extend(e for e in evicted_entities if e not in affected_entities)
+
+        await self._apply_entities(affected_entities, non_managed_entities, call.context, priority)
         self._schedule_save()
 
-    async def insert_state(self, call: ServiceCall):
+    @record_service_call
+    @profile_hot_path
+    async def insert_state(self, call: ServiceCall, targets: List[str] | None = None):
         entity_id = call.data.get(ATTR_ENTITY_ID)
         priority = call.data.get(ATTR_PRIORITY)
         layer_id = call.data.get(ATTR_ID)
         state = call.data.get(ATTR_STATE, STATE_ON)
         attributes = call.data.get(ATTR_ATTRIBUTES, {})
         should_clear = call.data.get(ATTR_CLEAR_LAYER)
+        clear_pattern = call.data.get(ATTR_CLEAR_PATTERN)
+        if targets is None:
+            targets = expand_entity_ids(self.hass, [entity_id])
 
         affected_entities = []
         extra_entities_to_update = []
         target_entities = []
+        zone_entities = self._get_zone_entities(targets)
 
         if should_clear:
             affected_entities.extend(self._clear_layer(layer_id))
+        if clear_pattern:
+            affected_entities.extend(e for e in self._clear_layer(clear_pattern, True) if e not in affected_entities)
 
         if split_entity_id(entity_id)[0] == DOMAIN_GROUP:
-            target_entities.extend(get_entity_ids(self.hass, entity_id))
+            # Store the layer once against the group, members resolve it at render time.
+            group_state = State(entity_id, state, attributes)
+            self._set_group_layer(entity_id, layer_id, priority, group_state)
+            for member_id in targets:
+                if member_id in self._entity_metadata:
+                    if member_id not in affected_entities:
+                        affected_entities.append(member_id)
+                elif member_id in zone_entities:
+                    extra_entities_to_update.append(State(member_id, state, attributes))
         else:
             target_entities.append(entity_id)
 
         for target_entity_id in target_entities:
-            if target_entity_id in self.managed_entities:
+            if meta := self._entity_metadata.get(target_entity_id):
                 if target_entity_id not in affected_entities:
                     affected_entities.append(target_entity_id)
 
                 overwrite_attributes = dict(attributes)
 
                 # Force Effect to None if not specified
-                if split_entity_id(target_entity_id)[0] == DOMAIN_LIGHT and ATTR_EFFECT not in overwrite_attributes:
+                if meta.domain == DOMAIN_LIGHT and ATTR_EFFECT not in overwrite_attributes:
                     overwrite_attributes[ATTR_EFFECT] = "None"
 
-                self.entity_states.setdefault(target_entity_id, {})[layer_id] = {
-                    ATTR_PRIORITY: priority,
-                    ATTR_STATE: State(target_entity_id, state, overwrite_attributes)
-                }
-            else:
+                self._set_layer(target_entity_id, layer_id, priority,
+                                State(target_entity_id, state, overwrite_attributes))
+            elif target_entity_id in zone_entities:
                 extra_entities_to_update.append(State(target_entity_id, state, attributes))
 
-        await self._apply_entities(affected_entities, extra_entities_to_update, call.context)
+        evicted_entities = self._evict_layers([entity_id], layer_id)
+        affected_entities.extend(e for e in evicted_entities if e not in affected_entities)
+
+        await self._apply_entities(affected_entities, extra_entities_to_update, call.context, priority)
         self._schedule_save()
 
-    async def remove_layer(self, call: ServiceCall):
+    @record_service_call
+    @profile_hot_path
+    async def remove_layer(self, call: ServiceCall, targets: List[str] | None = None):
         entity_id = call.data.get(ATTR_ENTITY_ID)
-        layer_id = call.data.get(ATTR_ID)
+        pattern = call.data.get(ATTR_ID)
+        glob = call.data.get(ATTR_MATCH) == MATCH_GLOB
         affected_entities = []
-        entities_to_check = []
-
-        if entity_id:
-            if split_entity_id(entity_id)[0] == DOMAIN_GROUP:
-                entities_to_check.extend(get_entity_ids(self.hass, entity_id))
-            else:
-                entities_to_check.append(entity_id)
+        changed = False
+
+        if not entity_id:
+            changed = bool(self._layer_index.match(pattern, glob))
+            affected_entities = self._clear_layer(pattern, glob)
+        elif split_entity_id(entity_id)[0] == DOMAIN_GROUP:
+            members = targets if targets is not None else get_entity_ids(self.hass, entity_id)
+            for layer_id in self._layer_index.match(pattern, glob):
+                owners = self._layer_index.get_owners(layer_id)
+                if entity_id in owners:
+                    affected_entities.extend(self._group_members.get(entity_id, []))
+                    self._pop_group_layer(entity_id, layer_id)
+                    changed = True
+
+                # Layers stored per member by earlier versions.
+                for member_id in members:
+                    if member_id in owners and member_id in self.managed_entities:
+                        self._pop_layer(member_id, layer_id)
+                        affected_entities.append(member_id)
         else:
-            entities_to_check.extend(self.managed_entities)
+            for layer_id in self._layer_index.match(pattern, glob):
+                if entity_id in self._layer_index.get_owners(layer_id) and entity_id in self.managed_entities:
+                    self._pop_layer(entity_id, layer_id)
+                    affected_entities.append(entity_id)
 
-        for check_entity_id in entities_to_check:
-            if check_entity_id in self.managed_entities and layer_id in self.entity_states.get(check_entity_id, {}):
-                self.entity_states[check_entity_id].pop(layer_id)
-                affected_entities.append(check_entity_id)
+                # Hide group layers from just this member.
+                for group_id in self._entity_groups.get(entity_id, ()):
+                    if (data := self.group_states[group_id].get(layer_id)) and entity_id not in data[ATTR_EXCLUDED]:
+                        data[ATTR_EXCLUDED].add(entity_id)
+                        self._send_delta(DELTA_LAYER_REMOVED, entity_id, layer_id=layer_id, group=group_id)
+                        affected_entities.append(entity_id)
+
+        affected_entities = list(dict.fromkeys(e for e in affected_entities if e in self.managed_entities))
 
         if affected_entities:
             await self._apply_entities(affected_entities, [], call.context)
+        if affected_entities or changed:
             self._schedule_save()
 
+    @record_service_call
+    @profile_hot_path
     async def remove_all_layers(self, call: ServiceCall):
         affected_entities = []
+        had_group_layers = bool(self.group_states)
+
+        for group_id in list(self.group_states.keys()):
+            affected_entities.extend(e for e in self._group_members.get(group_id, []) if e in self.managed_entities)
+            for layer_id in list(self.group_states[group_id].keys()):
+                self._pop_group_layer(group_id, layer_id)
 
         for entity_id in self.managed_entities:
-            if self.entity_states.get(entity_id, {}):
-                self.entity_states[entity_id] = {}
+            if layers := self.entity_states.get(entity_id, {}):
+                for layer_id in list(layers.keys()):
+                    self._pop_layer(entity_id, layer_id)
                 affected_entities.append(entity_id)
 
-        if affected_entities:
+        affected_entities = list(dict.fromkeys(affected_entities))
+
+        if affected_entities or had_group_layers:
             await self._apply_entities(affected_entities, [], call.context)
             self._schedule_save()
 
+    @record_service_call
+    @profile_hot_path
     async def refresh_all(self, call: ServiceCall):
         await self._apply_entities(self.managed_entities, [], call.context)
 
-    async def refresh(self, call: ServiceCall):
-        entity_id = call.data.get(ATTR_ENTITY_ID)
-        entities_to_refresh = []
-        if split_entity_id(entity_id)[0] == DOMAIN_GROUP:
-            entities_to_refresh.extend([e for e in get_entity_ids(self.hass, entity_id) if e in self.managed_entities])
-        elif entity_id in self.managed_entities:
-            entities_to_refresh.append(entity_id)
+    @record_service_call
+    @profile_hot_path
+    async def refresh(self, call: ServiceCall, targets: List[str] | None = None):
+        if targets is None:
+            targets = expand_entity_ids(self.hass, [call.data.get(ATTR_ENTITY_ID)])
+        entities_to_refresh = [e for e in targets if e in self.managed_entities]
 
         await self._apply_entities(entities_to_refresh, [], call.context)
 
-    async def add_adaptive(self, call: ServiceCall):
+    @record_service_call
+    @profile_hot_path
+    async def add_adaptive(self, call: ServiceCall, targets: List[str] | None = None):
         entity_id = call.data.get(ATTR_ENTITY_ID)
         brightness = call.data.get(ATTR_BRIGHTNESS)
         color_temp = call.data.get(ATTR_COLOR_TEMP)
         states_to_apply = []
 
-        target_entities = get_entity_ids(self.hass, entity_id) if split_entity_id(entity_id)[0] == DOMAIN_GROUP else [entity_id]
-
-        for light_entity in [e for e in target_entities if split_entity_id(e)[0] == DOMAIN_LIGHT]:
-            attrs = {}
-            props = AdaptiveProperties(
-                    light_entity, brightness is True, color_temp is True,
-                    None, None, None, None, None, None, None)
-            self._create_adaptive_track(light_entity, attrs, props)
-            if brightness not in (True, None):
-                attrs[ATTR_BRIGHTNESS] = brightness
-            if color_temp not in (True, None):
-                attrs[ATTR_COLOR_TEMP_KELVIN] = color_temp
-                attrs[ATTR_COLOR_MODE] = ColorMode.COLOR_TEMP
+        target_entities = targets if targets is not None else expand_entity_ids(self.hass, [entity_id])
+        zone_entities = self._get_zone_entities(target_entities)
 
-            states_to_apply.append(State(light_entity, STATE_ON, attrs))
+        with self._batch_adaptive_track():
+            for light_entity in [e for e in target_entities if split_entity_id(e)[0] == DOMAIN_LIGHT and e in zone_entities]:
+                attrs = {}
+                props = AdaptiveProperties(
+                        light_entity, brightness is True, color_temp is True,
+                        None, None, None, None, None, None, None)
+                self._create_adaptive_track(light_entity, attrs, props)
+                if brightness not in (True, None):
+                    attrs[ATTR_BRIGHTNESS] = brightness
+                if color_temp not in (True, None):
+                    attrs[ATTR_COLOR_TEMP_KELVIN] = color_temp
+                    attrs[ATTR_COLOR_MODE] = ColorMode.COLOR_TEMP
+
+                states_to_apply.append(DispatchItem(light_entity, self._get_active_priority(light_entity),
+                                                    State(light_entity, STATE_ON, attrs), call.context, True))
 
         if states_to_apply:
-            await async_reproduce_state(self.hass, states_to_apply, context=call.context)
-
-    async def remove_adaptive(self, call: ServiceCall):
-        entity_id = call.data.get(ATTR_ENTITY_ID)
-        entities_to_remove = get_entity_ids(self.hass, entity_id) if split_entity_id(entity_id)[0] == DOMAIN_GROUP else [entity_id]
+            await self._dispatcher.async_dispatch(states_to_apply)
+
+    @record_service_call
+    @profile_hot_path
+    async def remove_adaptive(self, call: ServiceCall, targets: List[str] | None = None):
+        entities_to_remove = targets if targets is not None else expand_entity_ids(self.hass, [call.data.get(ATTR_ENTITY_ID)])
+        zone_entities = self._get_zone_entities(entities_to_remove)
+        entities_to_remove = [e for e in entities_to_remove if e in zone_entities]
         self._remove_entities_from_adaptive_track(entities_to_remove)
         await self._apply_entities(entities_to_remove, [], call.context)
 
-    def _clear_layer(self, layer_id: str) -> List[str]:
+    def _get_zone_entities(self, entity_ids: List[str]) -> set:
+        # Entities of other zones are left to their coordinator, entities no zone manages are sent by one zone only.
+        send_unmanaged = self._router.is_fallback(self, entity_ids)
+        return {
+            entity_id for entity_id in entity_ids
+            if (owner := self._router.get_owner(entity_id)) is self or (owner is None and send_unmanaged)
+        }
+
+    @property
+    def trace_active(self) -> bool:
+        return self._trace_recorder.active
+
+    async def start_trace(self, call: ServiceCall) -> ServiceResponse:
+        entity_ids = set(self.managed_entities) | {"sun.sun"}
+        entity_ids.update(self.config.options.get(CONF_ADAPTIVE, {}).get(CONF_ADAPTIVE_INPUT_ENTITIES, []))
+        path = self._trace_recorder.start(copy.deepcopy(dict(self.config.options)), entity_ids)
+        return {"file": path}
+
+    async def stop_trace(self, call: ServiceCall) -> ServiceResponse:
+        path, records = await self._trace_recorder.async_stop()
+        return {"file": path, "records": records}
+
+    @property
+    def profile_active(self) -> bool:
+        return self._profiler.active
+
+    async def start_profile(self, call: ServiceCall) -> None:
+        self._profiler.start(call.data.get(ATTR_DURATION), call.data.get(ATTR_CALLS), call.data.get(ATTR_TOP))
+
+    async def stop_profile(self, call: ServiceCall) -> ServiceResponse:
+        return await self._profiler.async_stop()
+
+    def _clear_layer(self, pattern: str, glob: bool = False) -> List[str]:
         affected = []
-        [self.entity_states[entity_id].pop(layer_id) and affected.append(entity_id)
-         for entity_id in self.managed_entities if layer_id in self.entity_states.get(entity_id, {})]
+        for layer_id in self._layer_index.match(pattern, glob):
+            for owner_id in list(self._layer_index.get_owners(layer_id)):
+                if owner_id in self.group_states:
+                    affected.extend(self._group_members.get(owner_id, []))
+                    self._pop_group_layer(owner_id, layer_id)
+                elif owner_id in self.managed_entities:
+                    self._pop_layer(owner_id, layer_id)
+                    affected.append(owner_id)
+
+        return list(dict.fromkeys(e for e in affected if e in self.managed_entities))
+
+    def _evict_layers(self, owner_ids: Iterable[str], inserted_layer_id: str | None = None) -> List[str]:
+        if not self._max_entity_layers and not self._max_layers:
+            return []
+
+        if self._eviction_policy == EVICTION_OLDEST:
+            eviction_key = lambda layer: (layer[2][ATTR_INSERTED], layer[2][ATTR_PRIORITY])
+        else:
+            eviction_key = lambda layer: (layer[2][ATTR_PRIORITY], layer[2][ATTR_INSERTED])
+
+        # The layer being inserted is never evicted to make room for itself.
+        owner_ids = list(dict.fromkeys(owner_ids))
+        protected = {(owner_id, inserted_layer_id) for owner_id in owner_ids}
+        touched_entities = set()
+        evicted = 0
+
+        if self._max_entity_layers:
+            entity_ids = dict.fromkeys(chain.from_iterable(
+                self._group_members.get(owner_id, []) if split_entity_id(owner_id)[0] == DOMAIN_GROUP else [owner_id]
+                for owner_id in owner_ids))
+            for entity_id in entity_ids:
+                if entity_id not in self.managed_entities:
+                    continue
+
+                # Count what the entity renders from, group layers included.
+                layers = [(entity_id, layer_id, data) for layer_id, data in self._iter_layers(entity_id)]
+                if (excess := len(layers) - self._max_entity_layers) <= 0:
+                    continue
+
+                candidates = [layer for layer in layers if layer[1] != inserted_layer_id]
+                for _, layer_id, data in heapq.nsmallest(excess, candidates, key=eviction_key):
+                    if layer_id in self.entity_states.get(entity_id, {}):
+                        self._pop_layer(entity_id, layer_id)
+                        evicted += 1
+                    else:
+                        # A group layer is only hidden from the member over its limit.
+                        group_id = next(g for g in self._entity_groups.get(entity_id, ())
+                                        if self.group_states[g].get(layer_id) is data)
+                        data[ATTR_EXCLUDED].add(entity_id)
+                        self._send_delta(DELTA_LAYER_REMOVED, entity_id, layer_id=layer_id, group=group_id)
+                    touched_entities.add(entity_id)
+
+        if self._max_layers and (excess := len(self._layer_index) - self._max_layers) > 0:
+            candidates = (
+                (owner_id, layer_id, data)
+                for owner_id, layers in chain(self.entity_states.items(), self.group_states.items())
+                for layer_id, data in layers.items() if (owner_id, layer_id) not in protected
+            )
+            for owner_id, layer_id, _ in heapq.nsmallest(excess, candidates, key=eviction_key):
+                if split_entity_id(owner_id)[0] == DOMAIN_GROUP:
+                    touched_entities.update(self._group_members.get(owner_id, []))
+                    self._pop_group_layer(owner_id, layer_id)
+                else:
+                    touched_entities.add(owner_id)
+                    self._pop_layer(owner_id, layer_id)
+                evicted += 1
+
+        if not touched_entities:
+            return []
+
+        self._evicted_layers += evicted
+        _LOGGER.debug("Evicted %d layers over the configured limits", evicted)
+
+        # Only entities whose winning layer was evicted need to be rendered again.
+        return [
+            entity_id for entity_id in touched_entities
+            if entity_id in self.managed_entities and self._winning_layers.get(entity_id) != (
+                active_layer[0] if (active_layer := self._get_active_layer(entity_id)) else None)
+        ]
+
+    def _set_layer(self, entity_id: str, layer_id: str, priority: int, state: State) -> None:
+        self.entity_states.setdefault(entity_id, {})[layer_id] = {
+            ATTR_PRIORITY: priority,
+            ATTR_STATE: state,
+            ATTR_INSERTED: dt_util.utcnow().timestamp()
+        }
+        self._layer_index.add(layer_id, entity_id)
+        self._send_delta(DELTA_LAYER_ADDED, entity_id, layer_id=layer_id, priority=priority,
+                         state=state.state, attributes=dict(state.attributes))
+
+    def _pop_layer(self, entity_id: str, layer_id: str) -> Dict | None:
+        data = self.entity_states.get(entity_id, {}).pop(layer_id, None)
+        if data is not None:
+            self._layer_index.discard(layer_id, entity_id)
+            self._send_delta(DELTA_LAYER_REMOVED, entity_id, layer_id=layer_id)
+        return data
+
+    def _set_group_layer(self, group_id: str, layer_id: str, priority: int, state: State) -> None:
+        new_group = group_id not in self.group_states
+        self.group_states.setdefault(group_id, {})[layer_id] = {
+            ATTR_PRIORITY: priority,
+            ATTR_STATE: state,
+            ATTR_INSERTED: dt_util.utcnow().timestamp(),
+            ATTR_EXCLUDED: set()
+        }
+        self._layer_index.add(layer_id, group_id)
+
+        if new_group:
+            self._index_group(group_id)
+            self._update_group_track()
+
+        self._send_delta(DELTA_LAYER_ADDED, group_id, layer_id=layer_id, priority=priority,
+                         state=state.state, attributes=dict(state.attributes),
+                         members=self._group_members.get(group_id, []))
+
+    def _pop_group_layer(self, group_id: str, layer_id: str) -> Dict | None:
+        data = self.group_states.get(group_id, {}).pop(layer_id, None)
+        if data is not None:
+            self._layer_index.discard(layer_id, group_id)
+            self._send_delta(DELTA_LAYER_REMOVED, group_id, layer_id=layer_id,
+                             members=self._group_members.get(group_id, []))
+
+        if group_id in self.group_states and not self.group_states[group_id]:
+            del self.group_states[group_id]
+            self._index_group(group_id)
+            self._update_group_track()
+
+        return data
+
+    def _index_group(self, group_id: str) -> tuple[List[str], List[str]]:
+        previous_members = self._group_members.pop(group_id, [])
+        for member_id in previous_members:
+            if groups := self._entity_groups.get(member_id):
+                groups.discard(group_id)
+                if not groups:
+                    del self._entity_groups[member_id]
+
+        members = get_entity_ids(self.hass, group_id) if group_id in self.group_states else []
+        if group_id in self.group_states:
+            self._group_members[group_id] = members
+        for member_id in members:
+            self._entity_groups.setdefault(member_id, set()).add(group_id)
+
+        return previous_members, members
+
+    def _update_group_track(self) -> None:
+        if self._group_track_states_remover:
+            self._group_track_states_remover.async_update_listeners(TrackStates(False, set(self.group_states), None))
+
+    def _iter_layers(self, entity_id: str):
+        # Entity layers come first so they win priority ties, and shadow group layers with the same id.
+        layers = self.entity_states.get(entity_id, {})
+        yield from layers.items()
+        for group_id in self._entity_groups.get(entity_id, ()):
+            for layer_id, data in self.group_states[group_id].items():
+                if layer_id not in layers and entity_id not in data[ATTR_EXCLUDED]:
+                    yield layer_id, data
+
+    def _get_layer_state(self, data: Dict, entity_id: str) -> State:
+        # Layers loaded from the store hold their serialized state until first needed.
+        if isinstance(state := data[ATTR_STATE], dict):
+            state = data[ATTR_STATE] = State(state.get("entity_id", entity_id), state.get("state"),
+                                             state.get("attributes"))
+        return state
+
+    def _resolve_layer_state(self, entity_id: str, state: State) -> State:
+        # Group layers hold the group's state, materialize it for the member being rendered.
+        if state.entity_id == entity_id:
+            return state
+        return self._handle_replacements(entity_id, State(entity_id, state.state, state.attributes))
 
-        return affected
+    @callback
+    def _send_delta(self, delta_type: str, entity_id: str, **data: Any) -> None:
+        async_dispatcher_send(self.hass, SIGNAL_LAYER_DELTA, {"type": delta_type, ATTR_ENTITY_ID: entity_id, **data})
 
     def _handle_replacements(self, entity_id: str, state: State, color: list | None = None) -> State:
-        if split_entity_id(entity_id)[0] == DOMAIN_LIGHT:
+        domain = self._get_domain(entity_id)
+        if domain == DOMAIN_LIGHT or (domain == DOMAIN_GROUP and color):
             new_attributes = dict(state.attributes)
 
-            # Also default to no effect if not specified.
-            if ATTR_EFFECT not in state.attributes:
+            # Also default to no effect if not specified. Group members get this when they are rendered.
+            if domain == DOMAIN_LIGHT and ATTR_EFFECT not in state.attributes:
                 new_attributes[ATTR_EFFECT] = "None"
 
             if color:
@@ -354,18 +813,19 @@ class LayerManagerCoordinator:
         else:
             return state
 
-    def _render_entity(self, entity_id: str) -> State | tuple:
-        layers = self.entity_states.get(entity_id)
-        if not layers:
+    def _render_entity(self, entity_id: str, meta: EntityMetadata) -> State | tuple:
+        active_layer = self._get_active_layer(entity_id)
+        self._update_winning_layer(entity_id, active_layer)
+
+        if not active_layer:
             if entity_id in self.adaptive_entities:
                 self._remove_entities_from_adaptive_track([entity_id])
-            if (default_state := self._get_default_state(entity_id)) is not None:
-                return State(entity_id, default_state)
+            if meta.default_state is not None:
+                return State(entity_id, meta.default_state)
             else:
                 return None
 
-        active_layer = max(layers.values(), key=lambda layer: layer[ATTR_PRIORITY])
-        active_state = active_layer[ATTR_STATE]
+        active_state = self._resolve_layer_state(entity_id, self._get_layer_state(active_layer[1], entity_id))
         has_adaptive = self._state_has_adaptive(active_state)
 
         if has_adaptive:
@@ -397,7 +857,7 @@ class LayerManagerCoordinator:
             self._remove_entities_from_adaptive_track([entity_id])
 
         # Handle service call enhancements
-        if split_entity_id(entity_id)[0] == DOMAIN_COVER:
+        if meta.domain == DOMAIN_COVER:
             if ATTR_CURRENT_TILT_POSITION in active_state.attributes:
                 return (
                     DOMAIN_COVER,
@@ -418,51 +878,65 @@ class LayerManagerCoordinator:
 
         return active_state
 
+    def _update_winning_layer(self, entity_id: str, active_layer: tuple[str, Dict] | None) -> None:
+        layer_id = active_layer[0] if active_layer else None
+        previous_layer_id = self._winning_layers.get(entity_id)
+        if layer_id != previous_layer_id:
+            self._winning_layers[entity_id] = layer_id
+            self._send_delta(DELTA_WINNING_LAYER_CHANGED, entity_id, layer_id=layer_id,
+                             priority=active_layer[1][ATTR_PRIORITY] if active_layer else None,
+                             previous_layer_id=previous_layer_id)
+
     def _state_has_adaptive(self, state: State) -> bool:
         brightness = state.attributes.get(ATTR_BRIGHTNESS, None)
         color_temp = state.attributes.get(ATTR_COLOR_TEMP_KELVIN, None)
 
-        return split_entity_id(state.entity_id)[0] == DOMAIN_LIGHT and (
+        return self._get_domain(state.entity_id) == DOMAIN_LIGHT and (
             (isinstance(brightness, str) and brightness.startswith(CONF_ADAPTIVE)) or
             (isinstance(color_temp, str) and color_temp.startswith(CONF_ADAPTIVE)))
 
     def _create_adaptive_track(self, entity_id: str, state_attributes: Dict, props: AdaptiveProperties) -> None:
-
-        adaptive_config = self.config.options.get(CONF_ADAPTIVE, {})
-        entity_adaptive_config = self.config.options.get(CONF_ENTITIES, {}).get(entity_id, {}).get(CONF_ADAPTIVE, {})
+        meta = self._entity_metadata.get(entity_id)
+        adaptive_config = meta.adaptive_config if meta else self._global_adaptive_config
 
         ap = AdaptiveProperties(
             entity_id=entity_id, enable_brightness=props.enable_brightness,
-            enable_color_temp=props.enable_color_temp,
-            brightness_input_entity_id=entity_adaptive_config.get(CONF_INPUT_BRIGHTNESS_ENTITY, adaptive_config.get(CONF_INPUT_BRIGHTNESS_ENTITY)),
-            brightness_input_min=entity_adaptive_config.get(CONF_INPUT_BRIGHTNESS_MIN, adaptive_config.get(CONF_INPUT_BRIGHTNESS_MIN)),
-            brightness_input_max=entity_adaptive_config.get(CONF_INPUT_BRIGHTNESS_MAX, adaptive_config.get(CONF_INPUT_BRIGHTNESS_MAX)),
-            brightness_min=entity_adaptive_config.get(CONF_MIN_BRIGHTNESS, adaptive_config.get(CONF_MIN_BRIGHTNESS)),
-            brightness_max=entity_adaptive_config.get(CONF_MAX_BRIGHTNESS, adaptive_config.get(CONF_MAX_BRIGHTNESS)),
-            color_temp_min=entity_adaptive_config.get(CONF_MIN_COLOR_TEMP, adaptive_config.get(CONF_MIN_COLOR_TEMP)),
-            color_temp_max=entity_adaptive_config.get(CONF_MAX_COLOR_TEMP, adaptive_config.get(CONF_MAX_COLOR_TEMP))
-        )
+            enable_color_temp=props.enable_color_temp, **adaptive_config)
 
         self._set_adaptive_values(ap, state_attributes)
         if entity_id not in self.adaptive_entities:
             self._add_entity_to_adaptive_track(ap)
+        else:
+            self.adaptive_entities[entity_id] = ap
 
     def _set_adaptive_values(self, ap: AdaptiveProperties, state_attributes: Dict) -> None:
+        values = {}
+
         if ap.enable_brightness and ap.brightness_input_entity_id and (input_state := self.hass.states.get(ap.brightness_input_entity_id)):
             try:
-                input_val = float(input_state.state)
-                norm_val = 1.0 - (float(min(max(input_val, ap.brightness_input_min), ap.brightness_input_max)) / float(ap.brightness_input_max))
-                state_attributes[ATTR_BRIGHTNESS] = int(ap.brightness_max - ((ap.brightness_max - ap.brightness_min) * norm_val))
+                input_val = self._get_input_value(ap.brightness_input_entity_id, input_state)
+                input_val = apply_bound_hysteresis(input_val, self._bounded_inputs.get(ap.entity_id),
+                                                   ap.brightness_input_min, ap.brightness_input_max,
+                                                   self._input_hysteresis)
+                self._bounded_inputs[ap.entity_id] = input_val
+                norm_val = 1.0 - (float(input_val) / float(ap.brightness_input_max))
+                values[ATTR_BRIGHTNESS] = int(ap.brightness_max - ((ap.brightness_max - ap.brightness_min) * norm_val))
             except (ValueError, TypeError):
                 pass
 
         if ap.enable_color_temp:
             try:
-                state_attributes[ATTR_COLOR_TEMP_KELVIN] = int(round(((ap.color_temp_max - ap.color_temp_min) * self._adaptive_color_temp_factor) + ap.color_temp_min))
-                state_attributes[ATTR_COLOR_MODE] = ColorMode.COLOR_TEMP
+                values[ATTR_COLOR_TEMP_KELVIN] = int(round(((ap.color_temp_max - ap.color_temp_min) * self._adaptive_color_temp_factor) + ap.color_temp_min))
+                values[ATTR_COLOR_MODE] = ColorMode.COLOR_TEMP
             except (ValueError, TypeError):
                 pass
 
+        state_attributes.update(values)
+        if values and self._adaptive_values.get(ap.entity_id) != values:
+            self._adaptive_values[ap.entity_id] = values
+            self._send_delta(DELTA_ADAPTIVE_CHANGED, ap.entity_id, values=dict(values))
+
+    @profile_hot_path
     async def _update_adaptive(self, context: Context, input_entity_id: str | None = None) -> None:
         states_to_apply = []
         for ap in list(self.adaptive_entities.values()):
@@ -473,99 +947,126 @@ class LayerManagerCoordinator:
                 attrs = {}
                 self._set_adaptive_values(ap, attrs)
                 if attrs:
-                    states_to_apply.append(State(ap.entity_id, STATE_ON, attrs))
+                    states_to_apply.append(DispatchItem(ap.entity_id, self._get_active_priority(ap.entity_id),
+                                                        State(ap.entity_id, STATE_ON, attrs), context, True))
 
         if states_to_apply:
-            await async_reproduce_state(self.hass, states_to_apply, context=context)
+            await self._dispatcher.async_dispatch(states_to_apply)
 
     def _add_entity_to_adaptive_track(self, props: AdaptiveProperties) -> None:
         self.adaptive_entities[props.entity_id] = props
-        self._adaptive_track_states_remover.async_update_listeners(TrackStates(False, set(self.adaptive_entities.keys()), None))
+        self._send_delta(DELTA_ADAPTIVE_ADDED, props.entity_id, properties=dict(props.__dict__))
+        self._adaptive_track_removed.discard(props.entity_id)
+        self._adaptive_track_added.add(props.entity_id)
+        self._commit_adaptive_track()
 
     def _remove_entities_from_adaptive_track(self, entity_ids: List[str]) -> None:
-        removed = False
         for entity_id in entity_ids:
             if entity_id in self.adaptive_entities:
                 del self.adaptive_entities[entity_id]
-                removed = True
-
-        if removed:
-            self._adaptive_track_states_remover.async_update_listeners(TrackStates(False, set(self.adaptive_entities.keys()), None))
-
-    async def _apply_entities(self, entities: List[str], additional_states: List[State], context: Context | None):
-        states_to_apply = additional_states[:]
-
-        for entity_id in entities:
-            if entity_id not in self.managed_entities:
-                continue
-
-            rendered_state = self._render_entity(entity_id)
-            if rendered_state is None:
-                continue
-
-            if isinstance(rendered_state, State):
-                states_to_apply.append(rendered_state)
-            elif isinstance(rendered_state, tuple):
-                domain, service, service_data = rendered_state
-                try:
-                    await self.hass.services.async_call(
-                        domain,
-                        service,
-                        service_data,
-                        blocking=False
-                    )
-                except Exception as e:
-                    _LOGGER.error(f"Exception while calling {domain}.{service} on {entity_id}: {type(e).__name__}: {e}")
+                self._adaptive_values.pop(entity_id, None)
+                self._bounded_inputs.pop(entity_id, None)
+                self._send_delta(DELTA_ADAPTIVE_REMOVED, entity_id)
+                self._adaptive_track_added.discard(entity_id)
+                self._adaptive_track_removed.add(entity_id)
+
+        self._commit_adaptive_track()
+
+    @contextmanager
+    def _batch_adaptive_track(self):
+        # Defer tracker updates so a whole render pass is committed with a single listener update.
+        self._adaptive_track_batch_depth += 1
+        try:
+            yield
+        finally:
+            self._adaptive_track_batch_depth -= 1
+            self._commit_adaptive_track()
+
+    def _commit_adaptive_track(self) -> None:
+        if self._adaptive_track_batch_depth or not self._adaptive_track_states_remover:
+            return
 
-        if states_to_apply:
-            await async_reproduce_state(self.hass, states_to_apply, context=context)
-
-    def _get_default_state(self, entity_id: str):
-        return (self.config.options.get(CONF_ENTITIES, {}).get(entity_id, {}).get(CONF_DEFAULT_STATE, None) or
-            get_domain_default_state(split_entity_id(entity_id)[0]))
-
-    async def async_setup_services(self):
-        self.hass.services.async_register(DOMAIN, SERVICE_INSERT_SCENE, self.insert_scene, SERVICE_INSERT_SCENE_SCHEMA)
-        self.hass.services.async_register(DOMAIN, SERVICE_INSERT_STATE, self.insert_state, SERVICE_INSERT_STATE_SCHEMA)
-        self.hass.services.async_register(DOMAIN, SERVICE_REMOVE_LAYER, self.remove_layer, SERVICE_REMOVE_LAYER_SCHEMA)
-        self.hass.services.async_register(DOMAIN, SERVICE_REMOVE_ALL_LAYERS, self.remove_all_layers)
-        self.hass.services.async_register(DOMAIN, SERVICE_REFRESH_ALL, self.refresh_all)
-        self.hass.services.async_register(DOMAIN, SERVICE_REFRESH, self.refresh, SERVICE_REFRESH_SCHEMA)
-        self.hass.services.async_register(DOMAIN, SERVICE_ADD_ADAPTIVE, self.add_adaptive, SERVICE_ADD_ADAPTIVE_SCHEMA)
-        self.hass.services.async_register(DOMAIN, SERVICE_REMOVE_ADAPTIVE, self.remove_adaptive, SERVICE_REMOVE_ADAPTIVE_SCHEMA)
+        # Only the difference to what is already tracked is applied, re-adding a tracked light changes nothing.
+        added = self._adaptive_track_added - self._adaptive_tracked
+        removed = self._adaptive_track_removed & self._adaptive_tracked
+        self._adaptive_track_added.clear()
+        self._adaptive_track_removed.clear()
+        if not added and not removed:
+            return
+
+        # A new set is built, the tracker diffs it against the one it was given last time.
+        self._adaptive_tracked = (self._adaptive_tracked | added) - removed
+        self._adaptive_track_states_remover.async_update_listeners(TrackStates(False, self._adaptive_tracked, None))
+
+    @profile_hot_path
+    async def _apply_entities(self, entities: List[str], additional_states: List[State], context: Context | None,
+                              additional_priority: int = 0):
+        items_to_apply = [DispatchItem(state.entity_id, additional_priority, state, context)
+                          for state in additional_states]
+
+        with self._batch_adaptive_track():
+            for entity_id in entities:
+                if (meta := self._entity_metadata.get(entity_id)) is None:
+                    continue
+
+                rendered_state = self._render_entity(entity_id, meta)
+                if rendered_state is None:
+                    continue
+
+                items_to_apply.append(DispatchItem(entity_id, self._get_active_priority(entity_id), rendered_state, context))
+
+        if items_to_apply:
+            await self._dispatcher.async_dispatch(items_to_apply)
+
+    def _get_active_layer(self, entity_id: str) -> tuple[str, Dict] | None:
+        return max(self._iter_layers(entity_id), key=lambda layer: layer[1][ATTR_PRIORITY], default=None)
+
+    def _get_active_priority(self, entity_id: str) -> int:
+        active_layer = self._get_active_layer(entity_id)
+        return active_layer[1][ATTR_PRIORITY] if active_layer else 0
 
     async def async_unload(self):
-        for service in self.hass.services.async_services().get(DOMAIN, {}):
-            self.hass.services.async_remove(DOMAIN, service)
         for unsub in self._unsub_listeners:
             unsub()
         self._unsub_listeners.clear()
         self._adaptive_track_states_remover.async_remove()
+        self._input_track_states_remover.async_remove()
+        self._managed_track_states_remover.async_remove()
+        self._group_track_states_remover.async_remove()
+        self._cancel_solar_schedule()
+        self._cancel_input_updates()
+        self._dispatcher.async_shutdown()
+        self._profiler.async_shutdown()
+        if self._trace_recorder.active:
+            await self._trace_recorder.async_stop()
 
     async def async_setup_listeners(self):
-        for unsub in self._unsub_listeners:
-            unsub()
-        self._unsub_listeners.clear()
-
         # Get Initial Sun Value
-        if input_state := self.hass.states.get("sun.sun"):
-            await self._update_sun_factor(input_state)
+        await self._async_update_color_temp_source()
 
         self._unsub_listeners.append(async_track_state_change_filtered(
             self.hass, TrackStates(False, {"sun.sun"}, None), self.on_sun_changed).async_remove)
 
+        self._adaptive_tracked = set(self.adaptive_entities)
+        self._adaptive_track_added.clear()
+        self._adaptive_track_removed.clear()
         self._adaptive_track_states_remover = async_track_state_change_filtered(
-            self.hass, TrackStates(False, set(self.adaptive_entities.keys()), None), self.on_adaptive_light_change_event)
+            self.hass, TrackStates(False, self._adaptive_tracked, None), self.on_adaptive_light_change_event)
 
+        # Input and managed entity trackers are updated in place when options change.
         adaptive_opts = self.config.options.get(CONF_ADAPTIVE, {})
-        input_entities = adaptive_opts.get(CONF_ADAPTIVE_INPUT_ENTITIES, [])
-        if input_entities:
-            self._unsub_listeners.append(async_track_state_change_filtered(
-                self.hass, TrackStates(False, input_entities, None), self.on_input_brightness_change).async_remove)
+        self._input_track_states_remover = async_track_state_change_filtered(
+            self.hass, TrackStates(False, set(adaptive_opts.get(CONF_ADAPTIVE_INPUT_ENTITIES, [])), None),
+            self.on_input_brightness_change)
 
-        if self.managed_entities:
-            self._unsub_listeners.append(async_track_state_change_filtered(
-                self.hass, TrackStates(False, self.managed_entities, None), self.on_state_change_event).async_remove)
+        self._managed_track_states_remover = async_track_state_change_filtered(
+            self.hass, TrackStates(False, set(self.managed_entities), None), self.on_state_change_event)
+
+        # Groups may not have been available when layers were loaded from the store.
+        for group_id in self.group_states:
+            self._index_group(group_id)
+        self._group_track_states_remover = async_track_state_change_filtered(
+            self.hass, TrackStates(False, set(self.group_states), None), self.on_group_change_event)
 
     @callback
     async def on_state_change_event(self, event: Event) -> None:
@@ -574,24 +1075,115 @@ class LayerManagerCoordinator:
         new_state: State = event.data.get("new_state", STATE_UNAVAILABLE)
         entity_id = event.data.get(ATTR_ENTITY_ID)
 
+        if self._trace_recorder.active and any(
+                state is None or state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN) for state in (old_state, new_state)):
+            self._trace_recorder.record_state(new_state)
+
         if (new_state and
             (not old_state or old_state.state in (STATE_UNAVAILABLE, STATE_UNKNOWN)) and
             new_state.state not in (STATE_UNAVAILABLE, STATE_UNKNOWN)):
             await self._apply_entities([entity_id], [], event.context)
 
+    @callback
+    async def on_group_change_event(self, event: Event) -> None:
+        group_id = event.data.get(ATTR_ENTITY_ID)
+        if group_id not in self.group_states:
+            return
+
+        previous_members, members = self._index_group(group_id)
+        if set(previous_members) != set(members):
+            await self._apply_entities(list(dict.fromkeys(previous_members + members)), [], event.context)
+            async_dispatcher_send(self.hass, self.data_update_signal)
+
+    def _get_elevation_bounds(self) -> tuple[float, float]:
+        adaptive_opts = self.config.options.get(CONF_ADAPTIVE, {})
+        return (adaptive_opts.get(CONF_MIN_ELEVATION, self.config.options.get(CONF_MIN_ELEVATION, 0)),
+                adaptive_opts.get(CONF_MAX_ELEVATION, self.config.options.get(CONF_MAX_ELEVATION, 15)))
+
+    def _get_color_temp_steps(self) -> int:
+        step = self.config.options.get(CONF_ADAPTIVE, {}).get(CONF_COLOR_TEMP_STEP) or DEFAULT_COLOR_TEMP_STEP
+        widest_range = 0.0
+
+        for adaptive_config in [self._global_adaptive_config] + [m.adaptive_config for m in self._entity_metadata.values()]:
+            color_temp_min = adaptive_config["color_temp_min"]
+            color_temp_max = adaptive_config["color_temp_max"]
+            if color_temp_min is not None and color_temp_max is not None:
+                widest_range = max(widest_range, abs(float(color_temp_max) - float(color_temp_min)))
+
+        if widest_range <= 0:
+            return DEFAULT_SOLAR_SCHEDULE_STEPS
+
+        return max(1, math.ceil(widest_range / float(step)))
+
+    def _solar_schedule_enabled(self) -> bool:
+        return self.config.options.get(CONF_ADAPTIVE, {}).get(CONF_SOLAR_SCHEDULE, False)
+
+    async def _async_update_color_temp_source(self) -> None:
+        self._cancel_solar_schedule()
+
+        if self._solar_schedule_enabled():
+            await self._async_setup_solar_schedule()
+        elif sun_state := self.hass.states.get("sun.sun"):
+            await self._update_sun_factor(sun_state)
+
+    async def _async_setup_solar_schedule(self) -> None:
+        location, observer_elevation = get_astral_location(self.hass)
+        min_elev, max_elev = self._get_elevation_bounds()
+        start = dt_util.utcnow()
+        generation = self._solar_schedule_generation
+
+        schedule = await self.hass.async_add_executor_job(
+            compute_factor_schedule, location, observer_elevation, start, min_elev, max_elev,
+            self._get_color_temp_steps())
+
+        # The schedule was cancelled or the options changed while it was being computed.
+        if generation != self._solar_schedule_generation or not self._solar_schedule_enabled():
+            return
+
+        # The first entry is the factor right now, the rest are the instants where it changes next.
+        _, factor = schedule.pop(0)
+        self._cancel_solar_schedule()
+        self._solar_schedule = schedule
+        self._solar_schedule_end = start + SOLAR_SCHEDULE_DURATION
+        self._schedule_next_solar_update()
+        await self._set_color_temp_factor(factor)
+
+    def _schedule_next_solar_update(self) -> None:
+        point = self._solar_schedule[0][0] if self._solar_schedule else self._solar_schedule_end
+        self._unsub_solar_schedule = async_track_point_in_utc_time(self.hass, self.on_solar_schedule, point)
+
+    def _cancel_solar_schedule(self) -> None:
+        self._solar_schedule_generation += 1
+        if self._unsub_solar_schedule:
+            self._unsub_solar_schedule()
+            self._unsub_solar_schedule = None
+        self._solar_schedule = []
+        self._solar_schedule_end = None
+
+    async def on_solar_schedule(self, now: datetime) -> None:
+        self._unsub_solar_schedule = None
+
+        if not self._solar_schedule:
+            # Schedule exhausted, compute the next window.
+            await self._async_setup_solar_schedule()
+            return
+
+        factor = None
+        while self._solar_schedule and self._solar_schedule[0][0] <= now:
+            _, factor = self._solar_schedule.pop(0)
+
+        self._schedule_next_solar_update()
+        if factor is not None:
+            await self._set_color_temp_factor(factor)
+
     async def _update_sun_factor(self, sun_state: State, context: Context = None) -> None:
 
         elevation = sun_state.attributes[ATTR_ELEVATION]
+        min_elev, max_elev = self._get_elevation_bounds()
 
-        min_elev = self.config.options.get(CONF_MIN_ELEVATION, 0)
-        max_elev = self.config.options.get(CONF_MAX_ELEVATION, 15)
-        adaptive_color_temp_factor = 1.0
-
-        if max_elev > min_elev:
-            adaptive_color_temp_factor = (
-                min(max(elevation, min_elev), max_elev) - min_elev
-            ) / (max_elev - min_elev)
+        await self._set_color_temp_factor(get_elevation_factor(elevation, min_elev, max_elev), context)
 
+    async def _set_color_temp_factor(self, adaptive_color_temp_factor: float, context: Context = None) -> None:
         if adaptive_color_temp_factor != self._adaptive_color_temp_factor:
             self._adaptive_color_temp_factor = adaptive_color_temp_factor
             await self._update_adaptive(context, "sun")
@@ -604,6 +1196,13 @@ class LayerManagerCoordinator:
         if not new_state or not new_state.attributes.get(ATTR_ELEVATION):
             return
 
+        if self._trace_recorder.active:
+            self._trace_recorder.record_state(new_state)
+
+        # The precomputed solar schedule drives the color temperature instead.
+        if self._solar_schedule_enabled():
+            return
+
         await self._update_sun_factor(new_state, event.context)
 
     @callback
@@ -612,7 +1211,54 @@ class LayerManagerCoordinator:
         old_state: State = event.data.get("old_state")
 
         if new_state and old_state and new_state.state != old_state.state:
-            await self._update_adaptive(event.context, event.data.get("entity_id"))
+            if self._trace_recorder.active:
+                self._trace_recorder.record_state(new_state)
+
+            entity_id = event.data.get("entity_id")
+            smoother = self._get_input_smoother(entity_id)
+            try:
+                smoother.add(float(new_state.state))
+            except (ValueError, TypeError):
+                return
+
+            if entity_id in self._unsub_input_updates:
+                # A trailing update is already scheduled and will pick up this sample.
+                return
+
+            now = self.hass.loop.time()
+            if (delay := smoother.get_delay(now)) > 0:
+                self._unsub_input_updates[entity_id] = async_call_later(
+                    self.hass, delay, partial(self.on_input_update_due, entity_id))
+                return
+
+            smoother.mark_updated(now)
+            await self._update_adaptive(event.context, entity_id)
+
+    async def on_input_update_due(self, entity_id: str, now: datetime) -> None:
+        self._unsub_input_updates.pop(entity_id, None)
+        if smoother := self._input_smoothers.get(entity_id):
+            smoother.mark_updated(self.hass.loop.time())
+        await self._update_adaptive(None, entity_id)
+
+    def _get_input_smoother(self, entity_id: str) -> InputSmoother:
+        if (smoother := self._input_smoothers.get(entity_id)) is None:
+            adaptive_opts = self.config.options.get(CONF_ADAPTIVE, {})
+            smoother = self._input_smoothers[entity_id] = InputSmoother(
+                adaptive_opts.get(CONF_INPUT_SMOOTHING, SMOOTHING_NONE),
+                int(adaptive_opts.get(CONF_INPUT_SMOOTHING_WINDOW) or DEFAULT_INPUT_SMOOTHING_WINDOW),
+                float(adaptive_opts.get(CONF_INPUT_MIN_INTERVAL) or 0))
+        return smoother
+
+    def _get_input_value(self, entity_id: str, input_state: State) -> float:
+        # Fall back to the raw state until the input has reported since the options were loaded.
+        if (smoother := self._input_smoothers.get(entity_id)) and (value := smoother.value) is not None:
+            return value
+        return float(input_state.state)
+
+    def _cancel_input_updates(self) -> None:
+        for unsub in self._unsub_input_updates.values():
+            unsub()
+        self._unsub_input_updates.clear()
 
     @callback
     async def on_adaptive_light_change_event(self, event: Event) -> None:
@@ -620,6 +1266,8 @@ class LayerManagerCoordinator:
         new_state: State = event.data.get("new_state")
 
         if (not old_state or old_state.state != new_state.state) and new_state.state == STATE_OFF:
+            if self._trace_recorder.active:
+                self._trace_recorder.record_state(new_state)
             self._remove_entities_from_adaptive_track([event.data.get(ATTR_ENTITY_ID)])
 
     @callback
@@ -628,10 +1276,8 @@ class LayerManagerCoordinator:
         entities = []
         adaptive_entities = []
 
-        for entity_id, layers in self.entity_states.items():
-            if entity_id not in self.managed_entities: continue
-
-            for layer_id, data in layers.items():
+        for entity_id in self.managed_entities:
+            for layer_id, data in self._iter_layers(entity_id):
                 layer_info = tracked_layers_dict.setdefault(layer_id, {
                     "priority": data.get(ATTR_PRIORITY),
                     "layer_id": layer_id,
@@ -646,8 +1292,7 @@ class LayerManagerCoordinator:
                 #     "attributes": state_obj.attributes
                 # }
 
-            if layers:
-                active_layer = max(layers.items(), key=lambda layer: layer[1][ATTR_PRIORITY])
+            if active_layer := self._get_active_layer(entity_id):
                 entities.append({
                     "entity_id": entity_id,
                     "active_layer": active_layer[0],
@@ -664,10 +1309,118 @@ class LayerManagerCoordinator:
             "entities": entities,
             "adaptive": {
                 "color_factor": self._adaptive_color_temp_factor,
+                "next_color_update": self._solar_schedule[0][0].isoformat() if self._solar_schedule else None,
                 "entities": adaptive_entities
-            }
+            },
+            "dispatch": self._dispatcher.get_summary(),
+            "dispatch_errors": self._dispatcher.get_errors(),
+            "evictions": self._evicted_layers
         }
 
+    @callback
+    def get_layers(self, entity_id: str | None = None, layer_id: str | None = None) -> List[Dict[str, Any]]:
+        entities = []
+
+        for check_entity_id in ([entity_id] if entity_id else self.managed_entities):
+            if check_entity_id not in self.managed_entities: continue
+
+            layers = dict(self._iter_layers(check_entity_id))
+            if layer_id is not None and layer_id not in layers: continue
+
+            active_layer = self._get_active_layer(check_entity_id)
+            entities.append({
+                "entity_id": check_entity_id,
+                "active_layer": active_layer[0] if active_layer else None,
+                "adaptive": check_entity_id in self.adaptive_entities,
+                "adaptive_values": self._adaptive_values.get(check_entity_id),
+                "layers": [
+                    {
+                        "layer_id": check_layer_id,
+                        "priority": data.get(ATTR_PRIORITY),
+                        "group": state.entity_id if state.entity_id != check_entity_id else None,
+                        "state": state.state,
+                        "attributes": dict(self._resolve_layer_state(check_entity_id, state).attributes)
+                    }
+                    for check_layer_id, data in layers.items() if layer_id is None or check_layer_id == layer_id
+                    for state in (self._get_layer_state(data, check_entity_id),)
+                ]
+            })
+
+        return entities
+
+    @callback
+    def get_digest(self) -> Dict[str, Any]:
+        layer_counts: Dict[str, int] = {}
+        band_counts: Dict[str, int] = {get_priority_band(band): 0 for band in PRIORITY_BANDS}
+        active_entities = 0
+
+        for entity_id in self.managed_entities:
+            layers = dict(self._iter_layers(entity_id))
+            if not layers: continue
+            active_entities += 1
+
+            for layer_id, data in layers.items():
+                if layer_id not in layer_counts:
+                    band_counts[get_priority_band(data.get(ATTR_PRIORITY))] += 1
+                layer_counts[layer_id] = layer_counts.get(layer_id, 0) + 1
+
+        return {
+            "layer_counts": layer_counts,
+            "priority_band_counts": band_counts,
+            "active_entities": active_entities,
+            "adaptive_entities": len(self.adaptive_entities),
+            "evictions": self._evicted_layers
+        }
+
+
+def serialize_layer_state(state: State | Dict) -> Dict[str, Any]:
+    if isinstance(state, dict):
+        return state
+
+    return {
+        "entity_id": state.entity_id,
+        "state": state.state,
+        "attributes": dict(state.attributes)
+    }
+
+
+def get_storage_key(entry_id: str) -> str:
+    return f"{STORAGE_KEY}.{entry_id}"
+
+
+def expand_entity_ids(hass: HomeAssistant, entity_ids: Iterable[str]) -> List[str]:
+    expanded = []
+    for entity_id in entity_ids:
+        if split_entity_id(entity_id)[0] == DOMAIN_GROUP:
+            expanded.extend(get_entity_ids(hass, entity_id))
+        else:
+            expanded.append(entity_id)
+    return expanded
+
+
+def _merge_adaptive_config(adaptive_opts: Dict[str, Any], entity_adaptive_opts: Dict[str, Any]) -> Dict[str, Any]:
+    # Entity settings override the global adaptive settings. Keys match the AdaptiveProperties fields.
+    return {
+        field: entity_adaptive_opts.get(key, adaptive_opts.get(key))
+        for field, key in (
+            ("brightness_input_entity_id", CONF_INPUT_BRIGHTNESS_ENTITY),
+            ("brightness_input_min", CONF_INPUT_BRIGHTNESS_MIN),
+            ("brightness_input_max", CONF_INPUT_BRIGHTNESS_MAX),
+            ("brightness_min", CONF_MIN_BRIGHTNESS),
+            ("brightness_max", CONF_MAX_BRIGHTNESS),
+            ("color_temp_min", CONF_MIN_COLOR_TEMP),
+            ("color_temp_max", CONF_MAX_COLOR_TEMP)
+        )
+    }
+
+
+def get_priority_band(priority: int | None) -> str:
+    index = max(bisect_right(PRIORITY_BANDS, priority or 0) - 1, 0)
+    lower = PRIORITY_BANDS[index]
+    if index + 1 < len(PRIORITY_BANDS):
+        return f"{lower}-{PRIORITY_BANDS[index + 1] - 1}"
+    return f"{lower}+"
+
 
 def get_domain_default_state(domain: str):
     if domain in (DOMAIN_LIGHT, DOMAIN_FAN):
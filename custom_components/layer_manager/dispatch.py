@@ -0,0 +1,253 @@
+import asyncio
+from dataclasses import dataclass
+import heapq
+import logging
+
+from typing import Any, Dict, List, Tuple
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import Context, HomeAssistant, State, split_entity_id
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.state import async_reproduce_state
+
+from .const import (DOMAIN, CONF_DISPATCH, CONF_DISPATCH_CONCURRENCY, CONF_DISPATCH_RATE, CONF_DISPATCH_INTEGRATIONS,
+                    CONF_DISPATCH_TIMEOUT, DEFAULT_DISPATCH_CONCURRENCY, DEFAULT_DISPATCH_RATE,
+                    DEFAULT_DISPATCH_TIMEOUT, UNPACED_INTEGRATIONS)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class DispatchItem:
+    entity_id: str
+    priority: int
+    command: State | Tuple[str, str, Dict[str, Any]]
+    context: Context | None = None
+    # Adaptive updates only carry the adaptive attributes and must not replace a queued full render.
+    partial: bool = False
+
+
+class DispatchLane:
+    def __init__(self, scheduler: "DispatchScheduler", key: str, integration: str):
+        self.scheduler = scheduler
+        self.key = key
+        self.integration = integration
+        self.concurrency: int = 0
+        self.rate: float = 0.0
+        self._pending: Dict[str, Tuple[int, DispatchItem]] = {}
+        self._deferred: Dict[str, DispatchItem] = {}
+        self._heap: List[Tuple[int, int, str]] = []
+        self._seq = 0
+        self._active = 0
+        self._next_send = 0.0
+        self._slot_freed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, item: DispatchItem) -> None:
+        if item.partial and (pending := self._pending.get(item.entity_id)) is not None:
+            queued = pending[1]
+            if isinstance(queued.command, State):
+                # Fold the adaptive attributes into the queued command, it keeps its place in the queue.
+                self._pending[item.entity_id] = (pending[0], merge_items(queued, item))
+            else:
+                self._deferred[item.entity_id] = merge_items(self._deferred[item.entity_id], item) \
+                    if item.entity_id in self._deferred else item
+            return
+
+        # A newer full command for the same entity supersedes the queued one.
+        self._deferred.pop(item.entity_id, None)
+        self._seq += 1
+        self._pending[item.entity_id] = (self._seq, item)
+        heapq.heappush(self._heap, (-item.priority, self._seq, item.entity_id))
+
+        if self._task is None or self._task.done():
+            # Started on the next loop iteration so the rest of a burst is queued and ordered before anything is sent.
+            self._task = self.scheduler.config.async_create_background_task(
+                self.scheduler.hass, self._async_run(), f"{DOMAIN} dispatch {self.key}", eager_start=False)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._deferred.clear()
+        self._heap.clear()
+
+    def _pop(self) -> DispatchItem | None:
+        while self._heap:
+            _, seq, entity_id = heapq.heappop(self._heap)
+            pending = self._pending.get(entity_id)
+            if pending and pending[0] == seq:
+                del self._pending[entity_id]
+                if (deferred := self._deferred.pop(entity_id, None)) is not None:
+                    self._seq += 1
+                    self._pending[entity_id] = (self._seq, deferred)
+                    heapq.heappush(self._heap, (-deferred.priority, self._seq, entity_id))
+                return pending[1]
+        return None
+
+    async def _async_run(self) -> None:
+        loop = self.scheduler.hass.loop
+        while self._pending:
+            if self.concurrency > 0 and self._active >= self.concurrency:
+                self._slot_freed.clear()
+                await self._slot_freed.wait()
+                continue
+
+            if self.rate > 0 and (delay := self._next_send - loop.time()) > 0:
+                # Re-check the queue after sleeping so higher priority commands that arrived meanwhile go first.
+                await asyncio.sleep(delay)
+                continue
+
+            # Without a rate limit everything the free slots allow leaves in this tick as a single batch.
+            batch_size = 1 if self.rate > 0 else self.concurrency - self._active if self.concurrency > 0 else len(self._pending)
+            batch = []
+            while len(batch) < batch_size and (item := self._pop()) is not None:
+                batch.append(item)
+            if not batch:
+                break
+
+            self._next_send = loop.time() + (1.0 / self.rate if self.rate > 0 else 0.0)
+            self._active += len(batch)
+            self.scheduler.config.async_create_background_task(
+                self.scheduler.hass, self._async_send(batch), f"{DOMAIN} dispatch {self.key}")
+
+    async def _async_send(self, batch: List[DispatchItem]) -> None:
+        try:
+            await self.scheduler.async_send(batch)
+        finally:
+            self._active -= len(batch)
+            self._slot_freed.set()
+
+
+class DispatchScheduler:
+    def __init__(self, hass: HomeAssistant, config: ConfigEntry):
+        self.hass = hass
+        self.config = config
+        self._lanes: Dict[str, DispatchLane] = {}
+        self._default_concurrency: int = DEFAULT_DISPATCH_CONCURRENCY
+        self._default_rate: float = DEFAULT_DISPATCH_RATE
+        self._integration_limits: Dict[str, Dict[str, Any]] = {}
+        self._timeout: float = DEFAULT_DISPATCH_TIMEOUT
+        self._errors: Dict[str, Dict[str, Any]] = {}
+
+        self.load_options()
+
+    def load_options(self) -> None:
+        dispatch_opts = self.config.options.get(CONF_DISPATCH, {})
+        self._default_concurrency = int(dispatch_opts.get(CONF_DISPATCH_CONCURRENCY, DEFAULT_DISPATCH_CONCURRENCY))
+        self._default_rate = float(dispatch_opts.get(CONF_DISPATCH_RATE, DEFAULT_DISPATCH_RATE))
+        self._integration_limits = {
+            integration: limits
+            for integration, limits in (dispatch_opts.get(CONF_DISPATCH_INTEGRATIONS) or {}).items()
+            if isinstance(limits, dict)
+        }
+        self._timeout = float(dispatch_opts.get(CONF_DISPATCH_TIMEOUT) or DEFAULT_DISPATCH_TIMEOUT)
+
+        for lane in self._lanes.values():
+            lane.concurrency, lane.rate = self._get_limits(lane.integration)
+
+    def _classify(self, entity_id: str) -> Tuple[str, str]:
+        if entry := er.async_get(self.hass).async_get(entity_id):
+            return entry.platform, entry.config_entry_id or entry.platform
+
+        domain = split_entity_id(entity_id)[0]
+        return domain, domain
+
+    def _get_limits(self, integration: str) -> Tuple[int, float]:
+        if integration in UNPACED_INTEGRATIONS and integration not in self._integration_limits:
+            return 0, 0.0
+
+        limits = self._integration_limits.get(integration) or {}
+        try:
+            return (int(limits.get(CONF_DISPATCH_CONCURRENCY, self._default_concurrency)),
+                    float(limits.get(CONF_DISPATCH_RATE, self._default_rate)))
+        except (ValueError, TypeError):
+            _LOGGER.warning(f"Ignoring invalid dispatch limits for {integration}: {limits}")
+            return self._default_concurrency, self._default_rate
+
+    async def async_dispatch(self, items: List[DispatchItem]) -> None:
+        immediate = []
+
+        for item in sorted(items, key=lambda i: i.priority, reverse=True):
+            integration, key = self._classify(item.entity_id)
+            concurrency, rate = self._get_limits(integration)
+            if concurrency <= 0 and rate <= 0:
+                immediate.append(item)
+                continue
+
+            if (lane := self._lanes.get(key)) is None:
+                lane = self._lanes[key] = DispatchLane(self, key, integration)
+                lane.concurrency, lane.rate = concurrency, rate
+            lane.enqueue(item)
+
+        if immediate:
+            await self.async_send(immediate)
+
+    async def async_send(self, items: List[DispatchItem]) -> None:
+        # Each domain is sent concurrently so a slow or failing domain does not hold up the others.
+        domain_items: Dict[str, List[DispatchItem]] = {}
+        for item in items:
+            domain_items.setdefault(split_entity_id(item.entity_id)[0], []).append(item)
+
+        await asyncio.gather(*(self._async_send_domain(domain, domain_items[domain]) for domain in domain_items))
+
+    async def _async_send_domain(self, domain: str, items: List[DispatchItem]) -> None:
+        states_to_apply = [item.command for item in items if isinstance(item.command, State)]
+        calls = [item for item in items if not isinstance(item.command, State)]
+
+        try:
+            async with asyncio.timeout(self._timeout):
+                await asyncio.gather(
+                    *(self._async_call_service(item) for item in calls),
+                    *([self._async_reproduce_states(domain, states_to_apply, items[0].context)] if states_to_apply else [])
+                )
+        except TimeoutError:
+            self._record_error(domain, f"Timed out after {self._timeout}s")
+            _LOGGER.error(f"Timed out after {self._timeout}s while sending to "
+                          f"{', '.join(item.entity_id for item in items)}")
+
+    async def _async_call_service(self, item: DispatchItem) -> None:
+        domain, service, service_data = item.command
+        try:
+            await self.hass.services.async_call(domain, service, service_data, blocking=False, context=item.context)
+        except Exception as e:
+            self._record_error(split_entity_id(item.entity_id)[0], f"{type(e).__name__}: {e}")
+            _LOGGER.error(f"Exception while calling {domain}.{service} on {item.entity_id}: {type(e).__name__}: {e}")
+
+    async def _async_reproduce_states(self, domain: str, states: List[State], context: Context | None) -> None:
+        try:
+            await async_reproduce_state(self.hass, states, context=context)
+        except Exception as e:
+            self._record_error(domain, f"{type(e).__name__}: {e}")
+            _LOGGER.error(f"Exception while applying states to "
+                          f"{', '.join(s.entity_id for s in states)}: {type(e).__name__}: {e}")
+
+    def _record_error(self, domain: str, error: str) -> None:
+        domain_errors = self._errors.setdefault(domain, {"count": 0, "last_error": None})
+        domain_errors["count"] += 1
+        domain_errors["last_error"] = error
+
+    def get_summary(self) -> Dict[str, Any]:
+        return {
+            lane.key: {"integration": lane.integration, "pending": lane.pending}
+            for lane in self._lanes.values() if lane.pending
+        }
+
+    def get_errors(self) -> Dict[str, Dict[str, Any]]:
+        # Copied so summaries handed out are not changed by later errors.
+        return {domain: dict(errors) for domain, errors in self._errors.items()}
+
+    def async_shutdown(self) -> None:
+        for lane in self._lanes.values():
+            lane.clear()
+        self._lanes.clear()
+
+
+def merge_items(queued: DispatchItem, item: DispatchItem) -> DispatchItem:
+    if not isinstance(queued.command, State):
+        return queued
+    return DispatchItem(queued.entity_id, queued.priority,
+                        State(queued.entity_id, queued.command.state, {**queued.command.attributes, **item.command.attributes}),
+                        item.context or queued.context, queued.partial)
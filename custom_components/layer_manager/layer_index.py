@@ -0,0 +1,56 @@
+from bisect import bisect_left, insort
+from fnmatch import fnmatchcase
+import re
+
+from typing import Dict, List, Set
+
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+class LayerIndex:
+    def __init__(self):
+        self._owners: Dict[str, Set[str]] = {}
+        self._sorted_ids: List[str] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, layer_id: str, owner_id: str) -> None:
+        if layer_id not in self._owners:
+            self._owners[layer_id] = set()
+            insort(self._sorted_ids, layer_id)
+        if owner_id not in self._owners[layer_id]:
+            self._owners[layer_id].add(owner_id)
+            self._size += 1
+
+    def discard(self, layer_id: str, owner_id: str) -> None:
+        owners = self._owners.get(layer_id)
+        if owners is None:
+            return
+
+        if owner_id in owners:
+            owners.discard(owner_id)
+            self._size -= 1
+        if not owners:
+            del self._owners[layer_id]
+            del self._sorted_ids[bisect_left(self._sorted_ids, layer_id)]
+
+    def get_owners(self, layer_id: str) -> Set[str]:
+        return self._owners.get(layer_id, set())
+
+    def match(self, pattern: str, glob: bool = False) -> List[str]:
+        if not glob or (glob_start := GLOB_CHARS.search(pattern)) is None:
+            return [pattern] if pattern in self._owners else []
+
+        # Only the ids sharing the literal prefix of the pattern are compared against the glob.
+        prefix = pattern[:glob_start.start()]
+        matches = []
+        for i in range(bisect_left(self._sorted_ids, prefix), len(self._sorted_ids)):
+            layer_id = self._sorted_ids[i]
+            if not layer_id.startswith(prefix):
+                break
+            if fnmatchcase(layer_id, pattern):
+                matches.append(layer_id)
+
+        return matches
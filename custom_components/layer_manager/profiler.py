@@ -0,0 +1,180 @@
+import asyncio
+import cProfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+import logging
+import pstats
+import time
+
+from typing import Any, Dict, List
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Nesting is tracked per task, so a hot path running concurrently in another task is measured as its own call.
+_depth: ContextVar[int] = ContextVar(f"{DOMAIN}_profile_depth", default=0)
+
+
+def profile_hot_path(func):
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        profiler: HotPathProfiler = self._profiler
+        if not profiler.active:
+            return await func(self, *args, **kwargs)
+
+        with profiler.measure(func.__name__):
+            return await func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class HotPathProfiler:
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._profile: cProfile.Profile | None = None
+        self._running = 0
+        self._remaining_calls: int | None = None
+        self._top = 0
+        self._unsub_timeout = None
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._result: asyncio.Task | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._profile is not None
+
+    @contextmanager
+    def measure(self, name: str):
+        # cProfile follows the event loop thread, so it is enabled while any task is inside a hot path.
+        # Work from other tasks interleaved at await points is included in the stats.
+        profile = self._profile
+        depth = _depth.get()
+        token = _depth.set(depth + 1)
+        if depth == 0:
+            if self._running == 0:
+                profile.enable()
+            self._running += 1
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _depth.reset(token)
+
+            if self._profile is profile:
+                timing = self._timings.setdefault(name, {"calls": 0, "total": 0.0, "max": 0.0})
+                timing["calls"] += 1
+                timing["total"] += elapsed
+                timing["max"] = max(timing["max"], elapsed)
+
+                if depth == 0:
+                    self._running -= 1
+                    if self._running == 0:
+                        profile.disable()
+                    if self._remaining_calls is not None:
+                        self._remaining_calls -= 1
+                        if self._remaining_calls <= 0:
+                            self._finish()
+
+    @callback
+    def start(self, duration: float, calls: int | None, top: int) -> None:
+        if self.active:
+            raise HomeAssistantError("A profiling session is already running")
+
+        self._profile = cProfile.Profile()
+        self._running = 0
+        self._remaining_calls = calls
+        self._top = top
+        self._timings = {}
+        self._result = None
+        self._unsub_timeout = async_call_later(self.hass, duration, self._on_timeout)
+
+    @callback
+    def async_shutdown(self) -> None:
+        if self._unsub_timeout:
+            self._unsub_timeout()
+            self._unsub_timeout = None
+        if self._profile and self._running:
+            self._profile.disable()
+        self._profile = None
+
+    async def async_stop(self) -> Dict[str, Any]:
+        self._finish()
+        if self._result is None:
+            raise HomeAssistantError("No profiling session has been started")
+        return await self._result
+
+    @callback
+    def _on_timeout(self, now: datetime) -> None:
+        self._unsub_timeout = None
+        self._finish()
+
+    @callback
+    def _finish(self) -> None:
+        if not self.active:
+            return
+
+        if self._unsub_timeout:
+            self._unsub_timeout()
+            self._unsub_timeout = None
+
+        profile = self._profile
+        if self._running:
+            profile.disable()
+        self._profile = None
+        self._running = 0
+
+        timings = {
+            name: {
+                "calls": timing["calls"],
+                "total_ms": round(timing["total"] * 1000, 3),
+                "avg_ms": round(timing["total"] * 1000 / timing["calls"], 3),
+                "max_ms": round(timing["max"] * 1000, 3)
+            }
+            for name, timing in self._timings.items()
+        }
+
+        # Kept until the next session so stop can still return a session that ended on its own.
+        self._result = self.hass.async_create_task(self._async_write(profile, timings, self._top),
+                                                   f"{DOMAIN} profile")
+
+    async def _async_write(self, profile: cProfile.Profile, timings: Dict[str, Any], top: int) -> Dict[str, Any]:
+        path = self.hass.config.path(f"{DOMAIN}_profile_{dt_util.utcnow().strftime('%Y%m%d%H%M%S')}.prof")
+        top_functions = await self.hass.async_add_executor_job(_write_stats, profile, path, top)
+        _LOGGER.info("Profile written to %s", path)
+
+        return {
+            "file": path,
+            "hot_paths": timings,
+            "top": top_functions
+        }
+
+
+def _write_stats(profile: cProfile.Profile, path: str, top: int) -> List[Dict[str, Any]]:
+    profile.dump_stats(path)
+
+    try:
+        stats = pstats.Stats(profile)
+    except TypeError:
+        # Nothing was recorded during the session.
+        return []
+
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            "function": f"{filename}:{line}({func_name})",
+            "calls": total_calls,
+            "total_ms": round(total_time * 1000, 3),
+            "cumulative_ms": round(cumulative_time * 1000, 3)
+        }
+        for (filename, line, func_name), (_, total_calls, total_time, cumulative_time, _) in entries
+    ]
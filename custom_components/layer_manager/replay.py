@@ -0,0 +1,229 @@
+"""Replay a recorded layer_manager trace against a local stand-in Home Assistant.
+
+Usage, from the Home Assistant configuration directory:
+
+    python -m custom_components.layer_manager.replay layer_manager_trace_<timestamp>.jsonl.gz
+"""
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import tempfile
+import time
+
+from types import SimpleNamespace
+from typing import Any, Dict
+
+from homeassistant import loader
+from homeassistant.const import ATTR_ENTITY_ID, STATE_OFF, STATE_ON
+from homeassistant.core import HomeAssistant, ServiceCall, State, split_entity_id
+from homeassistant.components.scene import DATA_COMPONENT as DATA_HA_SCENE
+from homeassistant.helpers import entity_registry as er
+
+from .const import (DOMAIN, DATA_ROUTER, CONF_DISPATCH, CONF_DISPATCH_CONCURRENCY, CONF_DISPATCH_RATE,
+                    CONF_DISPATCH_INTEGRATIONS)
+from .coordinator import LayerManagerCoordinator
+from .router import ServiceRouter
+from .trace import RECORD_CALL, RECORD_SCENE, RECORD_STATE, read_trace
+
+_LOGGER = logging.getLogger(__name__)
+
+STAND_IN_SERVICES = {
+    "light": ["turn_on", "turn_off", "toggle"],
+    "switch": ["turn_on", "turn_off", "toggle"],
+    "fan": ["turn_on", "turn_off", "toggle"],
+    "input_boolean": ["turn_on", "turn_off", "toggle"],
+    "cover": ["open_cover", "close_cover", "set_cover_position", "set_cover_tilt_position", "stop_cover"],
+    "number": ["set_value"],
+    "input_number": ["set_value"],
+    "select": ["select_option"],
+    "input_select": ["select_option"]
+}
+
+
+class ReplayConfigEntry:
+    def __init__(self, options: Dict[str, Any]):
+        self.entry_id = "replay"
+        self.title = "Replay"
+        self.options = options
+
+    def async_create_background_task(self, hass: HomeAssistant, target, name: str, eager_start: bool = True):
+        return hass.async_create_background_task(target, name, eager_start=eager_start)
+
+
+class ReplaySceneComponent:
+    def __init__(self):
+        self.scenes: Dict[str, SimpleNamespace] = {}
+
+    def add_scene(self, entity_id: str, states: list) -> None:
+        self.scenes[entity_id] = SimpleNamespace(scene_config=SimpleNamespace(
+            states={state[0]: State(*state) for state in states}))
+
+    def get_entity(self, entity_id: str) -> SimpleNamespace | None:
+        return self.scenes.get(entity_id)
+
+
+class ReplayStats:
+    def __init__(self):
+        self.commands: Dict[str, int] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def add_timing(self, name: str, elapsed: float) -> None:
+        timing = self.timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        timing["count"] += 1
+        timing["total"] += elapsed
+        timing["max"] = max(timing["max"], elapsed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "commands_total": sum(self.commands.values()),
+            "commands": dict(sorted(self.commands.items())),
+            "timings": {
+                name: {
+                    "count": timing["count"],
+                    "total_ms": round(timing["total"] * 1000, 3),
+                    "avg_ms": round(timing["total"] * 1000 / timing["count"], 3),
+                    "max_ms": round(timing["max"] * 1000, 3)
+                }
+                for name, timing in sorted(self.timings.items())
+            }
+        }
+
+
+def _register_stand_in_services(hass: HomeAssistant, stats: ReplayStats) -> None:
+    async def handle_command(call: ServiceCall) -> None:
+        entity_ids = call.data.get(ATTR_ENTITY_ID, [])
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+
+        key = f"{call.domain}.{call.service}"
+        stats.commands[key] = stats.commands.get(key, 0) + len(entity_ids)
+
+        for entity_id in entity_ids:
+            _apply_command(hass, entity_id, call.service, call.data)
+
+    for domain, services in STAND_IN_SERVICES.items():
+        for service in services:
+            hass.services.async_register(domain, service, handle_command)
+
+
+def _apply_command(hass: HomeAssistant, entity_id: str, service: str, data: Dict[str, Any]) -> None:
+    # Mirror the command into the state machine so reproduce_state sees realistic current states.
+    current = hass.states.get(entity_id)
+    attributes = dict(current.attributes) if current else {}
+    state = current.state if current else STATE_OFF
+    service_data = {k: v for k, v in data.items() if k != ATTR_ENTITY_ID}
+
+    if service == "turn_on":
+        state = STATE_ON
+        attributes.update(service_data)
+    elif service == "turn_off":
+        state = STATE_OFF
+    elif service == "toggle":
+        state = STATE_OFF if state == STATE_ON else STATE_ON
+    elif service == "open_cover":
+        state = "open"
+    elif service == "close_cover":
+        state = "closed"
+    elif service == "set_cover_position":
+        attributes["current_position"] = service_data.get("position")
+    elif service == "set_cover_tilt_position":
+        attributes["current_tilt_position"] = service_data.get("tilt_position")
+    elif service == "set_value":
+        state = str(service_data.get("value"))
+    elif service == "select_option":
+        state = str(service_data.get("option"))
+
+    hass.states.async_set(entity_id, state, attributes)
+
+
+async def async_replay(path: str, paced: bool = False) -> Dict[str, Any]:
+    header, records = await asyncio.get_running_loop().run_in_executor(None, read_trace, path)
+
+    options = copy.deepcopy(header.get("options", {}))
+    if not paced:
+        # Measure the integration itself, not the configured command pacing.
+        options[CONF_DISPATCH] = {CONF_DISPATCH_CONCURRENCY: 0, CONF_DISPATCH_RATE: 0, CONF_DISPATCH_INTEGRATIONS: {}}
+
+    stats = ReplayStats()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        loader.async_setup(hass)
+        await er.async_load(hass)
+
+        scenes = ReplaySceneComponent()
+        hass.data[DATA_HA_SCENE] = scenes
+        _register_stand_in_services(hass, stats)
+
+        for entity_id, state, attributes in header.get("states", []):
+            hass.states.async_set(entity_id, state, attributes)
+
+        router = hass.data[DATA_ROUTER] = ServiceRouter(hass)
+        router.async_setup_services()
+
+        entry = ReplayConfigEntry(options)
+        coordinator = LayerManagerCoordinator(hass, entry)
+        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+        router.async_register(coordinator)
+
+        try:
+            await coordinator.async_setup_listeners()
+
+            start = time.perf_counter()
+            await coordinator.async_initial_refresh()
+            await hass.async_block_till_done(wait_background_tasks=True)
+            stats.add_timing("initial_refresh", time.perf_counter() - start)
+
+            # Scenes are registered up front, traces from earlier versions recorded them after their first use.
+            for record in records:
+                if record[1] == RECORD_SCENE:
+                    scenes.add_scene(record[2], record[3])
+
+            replay_start = time.perf_counter()
+            for record in records:
+                record_type = record[1]
+                start = time.perf_counter()
+
+                if record_type == RECORD_SCENE:
+                    continue
+                elif record_type == RECORD_STATE:
+                    entity_id, state, attributes = record[2:5]
+                    hass.states.async_set(entity_id, state, attributes)
+                    name = f"state:{split_entity_id(entity_id)[0]}"
+                elif record_type == RECORD_CALL:
+                    await hass.services.async_call(DOMAIN, record[2], record[3], blocking=True)
+                    name = f"call:{record[2]}"
+                else:
+                    _LOGGER.warning("Skipping unknown trace record type %s", record_type)
+                    continue
+
+                await hass.async_block_till_done(wait_background_tasks=True)
+                stats.add_timing(name, time.perf_counter() - start)
+
+            replay_duration = time.perf_counter() - replay_start
+        finally:
+            await coordinator.async_unload()
+            await hass.async_stop(force=True)
+
+    return {
+        "records": len(records),
+        "recorded_duration_s": records[-1][0] if records else 0.0,
+        "replay_duration_s": round(replay_duration, 3),
+        **stats.as_dict()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a layer_manager trace as fast as possible.")
+    parser.add_argument("trace", help="Path to a trace recorded with layer_manager.start_trace")
+    parser.add_argument("--paced", action="store_true", help="Keep the recorded command dispatch limits")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps(asyncio.run(async_replay(args.trace, args.paced)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import logging
+
+from typing import Dict, Iterable, List
+
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.components.scene import DATA_COMPONENT as DATA_HA_SCENE
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import (DOMAIN, SERVICE_INSERT_SCENE, SERVICE_INSERT_STATE, SERVICE_REMOVE_LAYER, SERVICE_REMOVE_ALL_LAYERS,
+                    SERVICE_REFRESH_ALL, SERVICE_REFRESH, SERVICE_ADD_ADAPTIVE, SERVICE_REMOVE_ADAPTIVE,
+                    SERVICE_GET_SUMMARY, SERVICE_START_PROFILE, SERVICE_STOP_PROFILE, SERVICE_START_TRACE,
+                    SERVICE_STOP_TRACE)
+from .coordinator import (LayerManagerCoordinator, expand_entity_ids, SERVICE_INSERT_SCENE_SCHEMA, SERVICE_INSERT_STATE_SCHEMA,
+                          SERVICE_REMOVE_LAYER_SCHEMA, SERVICE_REFRESH_SCHEMA, SERVICE_ADD_ADAPTIVE_SCHEMA,
+                          SERVICE_REMOVE_ADAPTIVE_SCHEMA, SERVICE_START_PROFILE_SCHEMA, SERVICE_ZONE_SCHEMA)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ServiceRouter:
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._coordinators: List[LayerManagerCoordinator] = []
+        self._owners: Dict[str, LayerManagerCoordinator] = {}
+
+    @callback
+    def async_register(self, coordinator: LayerManagerCoordinator) -> None:
+        self._coordinators.append(coordinator)
+        self.async_update_zones()
+
+    @callback
+    def async_unregister(self, coordinator: LayerManagerCoordinator) -> None:
+        if coordinator in self._coordinators:
+            self._coordinators.remove(coordinator)
+        self.async_update_zones()
+
+    @callback
+    def async_update_zones(self) -> None:
+        # Zones are expected to be disjoint, the zone set up first keeps an entity claimed by several.
+        owners = {}
+        for coordinator in self._coordinators:
+            for entity_id in coordinator.managed_entities:
+                if (owner := owners.setdefault(entity_id, coordinator)) is not coordinator:
+                    _LOGGER.warning("%s is managed by both %s and %s, only %s will control it",
+                                    entity_id, owner.config.title, coordinator.config.title, owner.config.title)
+        self._owners = owners
+
+    def get_owner(self, entity_id: str) -> LayerManagerCoordinator | None:
+        return self._owners.get(entity_id)
+
+    def get_zone_coordinators(self, entity_ids: Iterable[str]) -> List[LayerManagerCoordinator]:
+        owners = {self._owners[e] for e in entity_ids if e in self._owners}
+        return [coordinator for coordinator in self._coordinators if coordinator in owners]
+
+    def is_fallback(self, coordinator: LayerManagerCoordinator, entity_ids: Iterable[str]) -> bool:
+        # Entities no zone manages are sent by a single coordinator: the first zone the call was routed to.
+        zone_coordinators = self.get_zone_coordinators(entity_ids)
+        if zone_coordinators:
+            return zone_coordinators[0] is coordinator
+        return bool(self._coordinators) and self._coordinators[0] is coordinator
+
+    @callback
+    def async_setup_services(self) -> None:
+        for service, schema, resolver in (
+            (SERVICE_INSERT_SCENE, SERVICE_INSERT_SCENE_SCHEMA, self._get_scene_targets),
+            (SERVICE_INSERT_STATE, SERVICE_INSERT_STATE_SCHEMA, self._get_entity_targets),
+            (SERVICE_REMOVE_LAYER, SERVICE_REMOVE_LAYER_SCHEMA, self._get_entity_targets),
+            (SERVICE_REMOVE_ALL_LAYERS, None, None),
+            (SERVICE_REFRESH_ALL, None, None),
+            (SERVICE_REFRESH, SERVICE_REFRESH_SCHEMA, self._get_entity_targets),
+            (SERVICE_ADD_ADAPTIVE, SERVICE_ADD_ADAPTIVE_SCHEMA, self._get_entity_targets),
+            (SERVICE_REMOVE_ADAPTIVE, SERVICE_REMOVE_ADAPTIVE_SCHEMA, self._get_entity_targets)
+        ):
+            self.hass.services.async_register(DOMAIN, service, self._create_handler(service, resolver), schema)
+
+        self.hass.services.async_register(DOMAIN, SERVICE_GET_SUMMARY, self.get_summary, SERVICE_ZONE_SCHEMA,
+                                          supports_response=SupportsResponse.ONLY)
+        self.hass.services.async_register(DOMAIN, SERVICE_START_PROFILE, self.start_profile,
+                                          SERVICE_START_PROFILE_SCHEMA)
+        self.hass.services.async_register(DOMAIN, SERVICE_STOP_PROFILE, self.stop_profile, SERVICE_ZONE_SCHEMA,
+                                          supports_response=SupportsResponse.ONLY)
+        self.hass.services.async_register(DOMAIN, SERVICE_START_TRACE, self.start_trace, SERVICE_ZONE_SCHEMA,
+                                          supports_response=SupportsResponse.OPTIONAL)
+        self.hass.services.async_register(DOMAIN, SERVICE_STOP_TRACE, self.stop_trace, SERVICE_ZONE_SCHEMA,
+                                          supports_response=SupportsResponse.OPTIONAL)
+
+    def _create_handler(self, service: str, resolver):
+        async def handle_service(call: ServiceCall) -> None:
+            # Targets are resolved once here and handed to every zone so they all see the same entities.
+            targets = resolver(call) if resolver else None
+            if targets is None:
+                # Calls without a target apply to every zone.
+                for coordinator in list(self._coordinators):
+                    await getattr(coordinator, service)(call)
+                return
+
+            for coordinator in self.get_zone_coordinators(targets) or self._coordinators[:1]:
+                await getattr(coordinator, service)(call, targets)
+
+        return handle_service
+
+    def _get_entity_targets(self, call: ServiceCall) -> List[str] | None:
+        if (entity_id := call.data.get(ATTR_ENTITY_ID)) is None:
+            return None
+        return expand_entity_ids(self.hass, [entity_id])
+
+    def _get_scene_targets(self, call: ServiceCall) -> List[str]:
+        scene_entity = self.hass.data.get(DATA_HA_SCENE, {}).get_entity(call.data.get(ATTR_ENTITY_ID))
+        return expand_entity_ids(self.hass, scene_entity.scene_config.states) if scene_entity else []
+
+    def _get_zone(self, call: ServiceCall) -> LayerManagerCoordinator:
+        if not self._coordinators:
+            raise HomeAssistantError("No Layer Manager zones are configured")
+
+        if entity_id := call.data.get(ATTR_ENTITY_ID):
+            if (owner := self.get_owner(entity_id)) is None:
+                raise HomeAssistantError(f"{entity_id} is not managed by any Layer Manager zone")
+            return owner
+
+        return self._coordinators[0]
+
+    async def get_summary(self, call: ServiceCall) -> ServiceResponse:
+        return self._get_zone(call).get_summary()
+
+    async def start_profile(self, call: ServiceCall) -> None:
+        await self._get_zone(call).start_profile(call)
+
+    async def stop_profile(self, call: ServiceCall) -> ServiceResponse:
+        if ATTR_ENTITY_ID not in call.data:
+            # Stop the zone that is profiling when none is given.
+            for coordinator in self._coordinators:
+                if coordinator.profile_active:
+                    return await coordinator.stop_profile(call)
+
+        return await self._get_zone(call).stop_profile(call)
+
+    async def start_trace(self, call: ServiceCall) -> ServiceResponse:
+        return await self._get_zone(call).start_trace(call)
+
+    async def stop_trace(self, call: ServiceCall) -> ServiceResponse:
+        if ATTR_ENTITY_ID not in call.data:
+            # Stop the zone that is recording when none is given.
+            for coordinator in self._coordinators:
+                if coordinator.trace_active:
+                    return await coordinator.stop_trace(call)
+
+        return await self._get_zone(call).stop_trace(call)
+
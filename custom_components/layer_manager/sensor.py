@@ -7,7 +7,7 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN, SIGNAL_DATA_UPDATE
+from .const import DOMAIN, CONF_COMPACT_STATUS
 from .coordinator import LayerManagerCoordinator
 
 async def async_setup_entry(
@@ -23,12 +23,13 @@ async def async_setup_entry(
 class LayerStatusSensor(SensorEntity):
 
     _attr_should_poll: bool = False
-    _attr_name: str = "Layer Manager Status"
     _attr_state_class = SensorStateClass.TOTAL
+    _unrecorded_attributes = frozenset({"layers", "entities", "adaptive", "dispatch", "dispatch_errors"})
 
     def __init__(self, coordinator: LayerManagerCoordinator):
         self.coordinator: LayerManagerCoordinator = coordinator
         self._attr_unique_id = f"{coordinator.config.entry_id}_status"
+        self._attr_name = f"{coordinator.config.title} Status"
         self._attr_native_value: int = 0
         self._attr_extra_state_attributes: Dict[str, Any] = {}
 
@@ -37,7 +38,7 @@ class LayerStatusSensor(SensorEntity):
 
         self.async_on_remove(
             async_dispatcher_connect(
-                self.hass, SIGNAL_DATA_UPDATE, self._handle_update
+                self.hass, self.coordinator.data_update_signal, self._handle_update
             )
         )
 
@@ -45,7 +46,11 @@ class LayerStatusSensor(SensorEntity):
 
     @callback
     def _handle_update(self) -> None:
-        info = self.coordinator.get_summary()
-        self._attr_native_value = len(info.get("layers", []))
+        if self.coordinator.config.options.get(CONF_COMPACT_STATUS, False):
+            info = self.coordinator.get_digest()
+            self._attr_native_value = len(info.get("layer_counts", {}))
+        else:
+            info = self.coordinator.get_summary()
+            self._attr_native_value = len(info.get("layers", []))
         self._attr_extra_state_attributes = info
         self.async_write_ha_state()
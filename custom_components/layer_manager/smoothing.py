@@ -0,0 +1,54 @@
+from collections import deque
+from statistics import median
+
+from .const import SMOOTHING_EMA, SMOOTHING_MEDIAN
+
+
+class InputSmoother:
+    def __init__(self, method: str, window: int, min_interval: float):
+        self.method = method
+        self.window = max(window, 1)
+        self.min_interval = min_interval
+        self._samples = deque(maxlen=self.window)
+        self._ema: float | None = None
+        self._last_update: float | None = None
+
+    @property
+    def value(self) -> float | None:
+        if not self._samples:
+            return None
+        if self.method == SMOOTHING_EMA:
+            return self._ema
+        if self.method == SMOOTHING_MEDIAN:
+            return median(self._samples)
+        return self._samples[-1]
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+        if self._ema is None:
+            self._ema = value
+        else:
+            # Same weighting as an N sample moving average.
+            alpha = 2.0 / (self.window + 1)
+            self._ema += alpha * (value - self._ema)
+
+    def get_delay(self, now: float) -> float:
+        if self._last_update is None or self.min_interval <= 0:
+            return 0.0
+        return max(self._last_update + self.min_interval - now, 0.0)
+
+    def mark_updated(self, now: float) -> None:
+        self._last_update = now
+
+
+def apply_bound_hysteresis(value: float, previous: float | None, lower: float, upper: float,
+                           hysteresis: float) -> float:
+    # Once clamped to a bound, the input has to move back past the bound by more than the hysteresis to leave it.
+    value = min(max(value, lower), upper)
+    if previous is None or hysteresis <= 0:
+        return value
+    if previous <= lower and value < lower + hysteresis:
+        return lower
+    if previous >= upper and value > upper - hysteresis:
+        return upper
+    return value
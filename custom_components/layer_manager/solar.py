@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from astral.location import Location
+
+
+def get_elevation_factor(elevation: float, min_elevation: float, max_elevation: float) -> float:
+    if max_elevation <= min_elevation:
+        return 1.0
+
+    return (min(max(elevation, min_elevation), max_elevation) - min_elevation) / (max_elevation - min_elevation)
+
+
+def quantize_factor(factor: float, steps: int) -> float:
+    return round(factor * steps) / steps
+
+
+def compute_factor_schedule(location: Location, observer_elevation: float, start: datetime,
+                            min_elevation: float, max_elevation: float, steps: int,
+                            duration: timedelta = timedelta(days=1),
+                            resolution: timedelta = timedelta(minutes=1)) -> List[Tuple[datetime, float]]:
+    # Walk the elevation curve and keep only the instants where the quantized factor changes.
+    # The first entry is always the factor at start.
+    schedule: List[Tuple[datetime, float]] = []
+    previous_factor = None
+    point = start
+    end = start + duration
+
+    while point <= end:
+        elevation = location.solar_elevation(point, observer_elevation)
+        factor = quantize_factor(get_elevation_factor(elevation, min_elevation, max_elevation), steps)
+        if factor != previous_factor:
+            schedule.append((point, factor))
+            previous_factor = factor
+        point += resolution
+
+    return schedule
@@ -0,0 +1,133 @@
+from functools import wraps
+import gzip
+import json
+import logging
+import time
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+from homeassistant.core import HomeAssistant, ServiceCall, State, split_entity_id
+from homeassistant.components.group import DOMAIN as DOMAIN_GROUP
+from homeassistant.components.scene import DATA_COMPONENT as DATA_HA_SCENE
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN, SERVICE_INSERT_SCENE
+
+_LOGGER = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+
+RECORD_CALL = "call"
+RECORD_STATE = "state"
+RECORD_SCENE = "scene"
+
+
+def record_service_call(func):
+    @wraps(func)
+    async def wrapper(self, call: ServiceCall, *args):
+        if self._trace_recorder.active:
+            self._trace_recorder.record_call(call)
+        return await func(self, call, *args)
+
+    return wrapper
+
+
+class TraceRecorder:
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self._path: str | None = None
+        self._header: Dict[str, Any] = {}
+        self._records: List[list] = []
+        self._start: float = 0.0
+        self._recorded_scenes: set = set()
+
+    @property
+    def active(self) -> bool:
+        return self._path is not None
+
+    def start(self, options: Dict[str, Any], entity_ids: Iterable[str]) -> str:
+        if self.active:
+            raise HomeAssistantError("A trace is already being recorded")
+
+        self._path = self.hass.config.path(f"{DOMAIN}_trace_{dt_util.utcnow().strftime('%Y%m%d%H%M%S')}.jsonl.gz")
+        self._records = []
+        self._recorded_scenes = set()
+        self._start = time.monotonic()
+        self._header = {
+            "version": TRACE_VERSION,
+            "started": dt_util.utcnow().isoformat(),
+            "options": options,
+            "states": [
+                serialize_state(state)
+                for entity_id in entity_ids if (state := self.hass.states.get(entity_id))
+            ]
+        }
+        return self._path
+
+    async def async_stop(self) -> Tuple[str, int]:
+        if not self.active:
+            raise HomeAssistantError("No trace is being recorded")
+
+        path, header, records = self._path, self._header, self._records
+        self._path = None
+        self._records = []
+
+        await self.hass.async_add_executor_job(write_trace, path, header, records)
+        _LOGGER.info("Trace with %d records written to %s", len(records), path)
+        return path, len(records)
+
+    def _offset(self) -> float:
+        return round(time.monotonic() - self._start, 3)
+
+    def record_call(self, call: ServiceCall) -> None:
+        # Snapshot what the call expands at handling time so replay resolves it the same way.
+        if (target := call.data.get("entity_id")) and split_entity_id(target)[0] == DOMAIN_GROUP:
+            if group_state := self.hass.states.get(target):
+                self.record_state(group_state)
+
+        # The scene has to precede the call using it so replay can register it first.
+        if call.service == SERVICE_INSERT_SCENE and (scene_component := self.hass.data.get(DATA_HA_SCENE)):
+            if scene_entity := scene_component.get_entity(target):
+                self.record_scene(target, scene_entity.scene_config.states)
+
+        self._records.append([self._offset(), RECORD_CALL, call.service, json_safe(dict(call.data))])
+
+    def record_scene(self, scene_entity_id: str, states: Dict[str, State]) -> None:
+        if scene_entity_id in self._recorded_scenes:
+            return
+
+        self._recorded_scenes.add(scene_entity_id)
+        for entity_id in states:
+            if split_entity_id(entity_id)[0] == DOMAIN_GROUP and (group_state := self.hass.states.get(entity_id)):
+                self.record_state(group_state)
+
+        self._records.append([self._offset(), RECORD_SCENE, scene_entity_id,
+                              [serialize_state(state) for state in states.values()]])
+
+    def record_state(self, state: State | None) -> None:
+        if state is not None:
+            self._records.append([self._offset(), RECORD_STATE, *serialize_state(state)])
+
+
+def serialize_state(state: State) -> list:
+    return [state.entity_id, state.state, json_safe(dict(state.attributes))]
+
+
+def json_safe(data: Any) -> Any:
+    return json.loads(json.dumps(data, default=str))
+
+
+def write_trace(path: str, header: Dict[str, Any], records: List[list]) -> None:
+    with gzip.open(path, "wt", encoding="utf-8") as trace_file:
+        trace_file.write(json.dumps(header, separators=(",", ":")) + "\n")
+        for record in records:
+            trace_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def read_trace(path: str) -> Tuple[Dict[str, Any], List[list]]:
+    with gzip.open(path, "rt", encoding="utf-8") as trace_file:
+        header = json.loads(trace_file.readline())
+        if header.get("version") != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version {header.get('version')}")
+        return header, [json.loads(line) for line in trace_file if line.strip()]
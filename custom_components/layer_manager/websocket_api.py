@@ -0,0 +1,70 @@
+from typing import Any, Dict, List
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN, ATTR_LAYER_ID, SIGNAL_LAYER_DELTA, WS_TYPE_LAYERS, WS_TYPE_SUBSCRIBE
+
+WS_FILTER_SCHEMA = {
+    vol.Optional(ATTR_ENTITY_ID): cv.entity_id,
+    vol.Optional(ATTR_LAYER_ID): cv.string
+}
+
+
+@callback
+def async_setup(hass: HomeAssistant) -> None:
+    websocket_api.async_register_command(hass, ws_layers)
+    websocket_api.async_register_command(hass, ws_subscribe)
+
+
+def _get_layers(hass: HomeAssistant, entity_id: str | None, layer_id: str | None) -> List[Dict[str, Any]]:
+    entities = []
+    for coordinator in hass.data.get(DOMAIN, {}).values():
+        entities.extend(coordinator.get_layers(entity_id, layer_id))
+    return entities
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_TYPE_LAYERS, **WS_FILTER_SCHEMA})
+@callback
+def ws_layers(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]) -> None:
+    connection.send_result(msg["id"], {
+        "entities": _get_layers(hass, msg.get(ATTR_ENTITY_ID), msg.get(ATTR_LAYER_ID))
+    })
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_TYPE_SUBSCRIBE, **WS_FILTER_SCHEMA})
+@callback
+def ws_subscribe(hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: Dict[str, Any]) -> None:
+    entity_id = msg.get(ATTR_ENTITY_ID)
+    layer_id = msg.get(ATTR_LAYER_ID)
+    pending: List[Dict[str, Any]] = []
+
+    @callback
+    def flush_deltas() -> None:
+        if msg["id"] in connection.subscriptions:
+            connection.send_message(websocket_api.event_message(msg["id"], {"deltas": pending[:]}))
+        pending.clear()
+
+    @callback
+    def on_delta(delta: Dict[str, Any]) -> None:
+        # Group layer deltas are keyed by the group and list the members they affect.
+        if entity_id and delta.get(ATTR_ENTITY_ID) != entity_id and entity_id not in delta.get("members", ()):
+            return
+        # Adaptive deltas carry no layer and are only filtered by entity.
+        if layer_id and delta.get("layer_id", layer_id) != layer_id and delta.get("previous_layer_id") != layer_id:
+            return
+
+        # Deltas produced by the same mutation are sent to the client as one message.
+        if not pending:
+            hass.loop.call_soon(flush_deltas)
+        pending.append(delta)
+
+    connection.subscriptions[msg["id"]] = async_dispatcher_connect(hass, SIGNAL_LAYER_DELTA, on_delta)
+    connection.send_result(msg["id"])
+    connection.send_message(websocket_api.event_message(msg["id"], {
+        "snapshot": _get_layers(hass, entity_id, layer_id)
+    }))
@@ -0,0 +1,28 @@
+import pytest
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.layer_manager.const import DOMAIN, DATA_ROUTER
+from custom_components.layer_manager.coordinator import LayerManagerCoordinator
+from custom_components.layer_manager.router import ServiceRouter
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+@pytest.fixture
+def create_coordinator(hass: HomeAssistant):
+    def _create(options, title="Layer Manager") -> LayerManagerCoordinator:
+        router = hass.data.setdefault(DATA_ROUTER, ServiceRouter(hass))
+        config = MockConfigEntry(domain=DOMAIN, title=title, options=options, minor_version=2)
+        config.add_to_hass(hass)
+        coordinator = LayerManagerCoordinator(hass, config)
+        router.async_register(coordinator)
+        return coordinator
+
+    return _create
@@ -0,0 +1,88 @@
+from homeassistant.core import HomeAssistant, State
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.layer_manager.const import (DOMAIN, CONF_DISPATCH, CONF_DISPATCH_INTEGRATIONS,
+                                                   CONF_DISPATCH_CONCURRENCY, CONF_DISPATCH_RATE)
+from custom_components.layer_manager.dispatch import DispatchItem, DispatchLane, DispatchScheduler
+
+
+def create_lane(hass: HomeAssistant, options=None) -> DispatchLane:
+    config = MockConfigEntry(domain=DOMAIN, options=options or {})
+    config.add_to_hass(hass)
+    lane = DispatchLane(DispatchScheduler(hass, config), "zha", "zha")
+    lane.concurrency = 1
+    return lane
+
+
+def drain(lane: DispatchLane):
+    items = []
+    while (item := lane._pop()) is not None:
+        items.append(item)
+    return items
+
+
+async def test_full_render_supersedes_queued_command(hass: HomeAssistant):
+    lane = create_lane(hass)
+    lane.enqueue(DispatchItem("light.a", 0, State("light.a", "on", {"brightness": 10})))
+    lane.enqueue(DispatchItem("light.a", 0, State("light.a", "off")))
+
+    items = drain(lane)
+    assert [item.command.state for item in items] == ["off"]
+
+
+async def test_adaptive_update_merges_into_queued_render(hass: HomeAssistant):
+    lane = create_lane(hass)
+    lane.enqueue(DispatchItem("light.a", 5, State("light.a", "on", {"brightness": 10, "rgb_color": (255, 0, 0)})))
+    lane.enqueue(DispatchItem("light.a", 0, State("light.a", "on", {"brightness": 200}), partial=True))
+
+    items = drain(lane)
+    assert len(items) == 1
+    assert items[0].priority == 5
+    assert items[0].command.attributes == {"brightness": 200, "rgb_color": (255, 0, 0)}
+
+
+async def test_adaptive_update_waits_behind_service_call(hass: HomeAssistant):
+    lane = create_lane(hass)
+    lane.enqueue(DispatchItem("light.a", 0, ("light", "turn_on", {"entity_id": "light.a"})))
+    lane.enqueue(DispatchItem("light.a", 0, State("light.a", "on", {"brightness": 20}), partial=True))
+    lane.enqueue(DispatchItem("light.a", 0, State("light.a", "on", {"color_temp_kelvin": 3000}), partial=True))
+
+    first, second = drain(lane)
+    assert first.command == ("light", "turn_on", {"entity_id": "light.a"})
+    assert second.command.attributes == {"brightness": 20, "color_temp_kelvin": 3000}
+
+
+async def test_queue_is_sent_by_priority(hass: HomeAssistant):
+    lane = create_lane(hass)
+    lane.enqueue(DispatchItem("light.low", 0, State("light.low", "on")))
+    lane.enqueue(DispatchItem("light.high", 10, State("light.high", "on")))
+
+    assert [item.entity_id for item in drain(lane)] == ["light.high", "light.low"]
+
+
+async def test_invalid_integration_limits_are_ignored(hass: HomeAssistant):
+    lane = create_lane(hass, {CONF_DISPATCH: {
+        CONF_DISPATCH_CONCURRENCY: 3,
+        CONF_DISPATCH_RATE: 2,
+        CONF_DISPATCH_INTEGRATIONS: {"zha": 5, "hue": {CONF_DISPATCH_CONCURRENCY: "many"}}
+    }})
+    scheduler = lane.scheduler
+
+    assert scheduler._get_limits("zha") == (3, 2.0)
+    assert scheduler._get_limits("hue") == (3, 2.0)
+
+
+async def test_unpaced_by_default(hass: HomeAssistant):
+    lane = create_lane(hass)
+
+    assert lane.scheduler._get_limits("zha") == (0, 0.0)
+
+
+async def test_errors_are_returned_as_a_copy(hass: HomeAssistant):
+    scheduler = create_lane(hass).scheduler
+    scheduler._record_error("light", "TimeoutError")
+    errors = scheduler.get_errors()
+
+    scheduler._record_error("light", "ValueError")
+
+    assert errors == {"light": {"count": 1, "last_error": "TimeoutError"}}
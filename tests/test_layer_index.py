@@ -0,0 +1,45 @@
+from custom_components.layer_manager.layer_index import LayerIndex
+
+
+def create_index() -> LayerIndex:
+    index = LayerIndex()
+    for layer_id, owner_id in (("motion.hall", "light.hall"), ("motion.kitchen", "light.kitchen"),
+                               ("motion.kitchen", "group.downstairs"), ("scene[1]", "light.hall"),
+                               ("movie", "light.tv")):
+        index.add(layer_id, owner_id)
+    return index
+
+
+def test_exact_match_ignores_glob_characters():
+    index = create_index()
+
+    assert index.match("scene[1]") == ["scene[1]"]
+    assert index.match("motion.*") == []
+
+
+def test_glob_match():
+    index = create_index()
+
+    assert index.match("motion.*", True) == ["motion.hall", "motion.kitchen"]
+    assert index.match("mo*", True) == ["motion.hall", "motion.kitchen", "movie"]
+    assert index.match("motion.?all", True) == ["motion.hall"]
+    assert index.match("scene[1]", True) == []
+
+
+def test_glob_without_wildcards_is_exact():
+    index = create_index()
+
+    assert index.match("movie", True) == ["movie"]
+
+
+def test_counts_layers_per_owner():
+    index = create_index()
+    assert len(index) == 5
+
+    index.discard("motion.kitchen", "light.kitchen")
+    assert len(index) == 4
+    assert index.get_owners("motion.kitchen") == {"group.downstairs"}
+
+    index.discard("motion.kitchen", "group.downstairs")
+    assert index.match("motion.*", True) == ["motion.hall"]
+    assert index.get_owners("motion.kitchen") == set()
@@ -0,0 +1,80 @@
+from homeassistant.const import ATTR_STATE
+from homeassistant.core import HomeAssistant, State
+
+from custom_components.layer_manager.const import (ATTR_INSERTED, ATTR_PRIORITY, CONF_ENTITIES,
+                                                   CONF_LAYER_LIMITS, CONF_MAX_ENTITY_LAYERS, CONF_MAX_LAYERS,
+                                                   CONF_EVICTION_POLICY, EVICTION_LOWEST_PRIORITY, EVICTION_OLDEST,
+                                                   STORAGE_VERSION)
+from custom_components.layer_manager.coordinator import get_storage_key
+
+
+def limit_options(max_entity_layers=0, max_layers=0, policy=EVICTION_LOWEST_PRIORITY):
+    return {
+        CONF_ENTITIES: {"light.a": {}, "light.b": {}},
+        CONF_LAYER_LIMITS: {
+            CONF_MAX_ENTITY_LAYERS: max_entity_layers,
+            CONF_MAX_LAYERS: max_layers,
+            CONF_EVICTION_POLICY: policy
+        }
+    }
+
+
+async def test_lowest_priority_keeps_inserted_layer(hass: HomeAssistant, create_coordinator):
+    coordinator = create_coordinator(limit_options(max_entity_layers=2))
+    coordinator._set_layer("light.a", "evening", 5, State("light.a", "on"))
+    coordinator._set_layer("light.a", "movie", 10, State("light.a", "on"))
+    coordinator._set_layer("light.a", "night", 1, State("light.a", "on"))
+
+    coordinator._evict_layers(["light.a"], "night")
+
+    assert set(coordinator.entity_states["light.a"]) == {"movie", "night"}
+    assert coordinator._evicted_layers == 1
+
+
+async def test_oldest_policy(hass: HomeAssistant, create_coordinator):
+    coordinator = create_coordinator(limit_options(max_entity_layers=2, policy=EVICTION_OLDEST))
+    for inserted, layer_id in enumerate(("first", "second", "third")):
+        coordinator._set_layer("light.a", layer_id, 5, State("light.a", "on"))
+        coordinator.entity_states["light.a"][layer_id][ATTR_INSERTED] = inserted
+
+    coordinator._evict_layers(["light.a"], "third")
+
+    assert set(coordinator.entity_states["light.a"]) == {"second", "third"}
+
+
+async def test_entity_limit_counts_group_layers(hass: HomeAssistant, create_coordinator):
+    hass.states.async_set("group.lights", "on", {"entity_id": ["light.a", "light.b"]})
+    coordinator = create_coordinator(limit_options(max_entity_layers=1))
+    coordinator._set_group_layer("group.lights", "evening", 5, State("group.lights", "on"))
+    coordinator._set_layer("light.a", "movie", 10, State("light.a", "on"))
+
+    coordinator._evict_layers(["light.a"], "movie")
+
+    # The group layer is only hidden from the member over its limit.
+    assert [layer_id for layer_id, _ in coordinator._iter_layers("light.a")] == ["movie"]
+    assert [layer_id for layer_id, _ in coordinator._iter_layers("light.b")] == ["evening"]
+
+
+async def test_global_limit(hass: HomeAssistant, create_coordinator):
+    coordinator = create_coordinator(limit_options(max_layers=2))
+    coordinator._set_layer("light.a", "evening", 5, State("light.a", "on"))
+    coordinator._set_layer("light.b", "movie", 10, State("light.b", "on"))
+    coordinator._set_layer("light.b", "night", 1, State("light.b", "on"))
+
+    coordinator._evict_layers(["light.b"], "night")
+
+    assert set(coordinator.entity_states["light.a"]) == set()
+    assert set(coordinator.entity_states["light.b"]) == {"movie", "night"}
+
+
+async def test_legacy_layers_are_stamped_on_load(hass: HomeAssistant, hass_storage, create_coordinator):
+    coordinator = create_coordinator(limit_options())
+    hass_storage[get_storage_key(coordinator.config.entry_id)] = {
+        "version": STORAGE_VERSION,
+        "key": get_storage_key(coordinator.config.entry_id),
+        "data": {"states": {"light.a": {"evening": {ATTR_PRIORITY: 5, ATTR_STATE: {"state": "on"}}}}}
+    }
+
+    await coordinator.async_load_from_store()
+
+    assert coordinator.entity_states["light.a"]["evening"][ATTR_INSERTED] > 0
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.layer_manager.profiler import HotPathProfiler
+
+
+async def test_concurrent_hot_paths_are_separate_calls(hass: HomeAssistant):
+    profiler = HotPathProfiler(hass)
+    profiler.start(60, 2, 5)
+    release = asyncio.Event()
+
+    async def hot_path():
+        with profiler.measure("insert_state"):
+            with profiler.measure("_apply_entities"):
+                await release.wait()
+
+    tasks = [hass.async_create_task(hot_path()) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert profiler.active
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    # Both outermost calls count towards the limit, which ends the session.
+    assert not profiler.active
+    result = await profiler.async_stop()
+    assert result["hot_paths"]["insert_state"]["calls"] == 2
+    assert result["hot_paths"]["_apply_entities"]["calls"] == 2
+
+
+async def test_stop_returns_running_session(hass: HomeAssistant):
+    profiler = HotPathProfiler(hass)
+    profiler.start(60, None, 5)
+    with profiler.measure("refresh"):
+        pass
+
+    result = await profiler.async_stop()
+
+    assert not profiler.active
+    assert result["hot_paths"]["refresh"]["calls"] == 1
+
+
+async def test_stop_without_session(hass: HomeAssistant):
+    with pytest.raises(HomeAssistantError):
+        await HotPathProfiler(hass).async_stop()
@@ -0,0 +1,70 @@
+from unittest.mock import AsyncMock, patch
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.layer_manager import async_migrate_entry
+from custom_components.layer_manager.const import (DOMAIN, DATA_ROUTER, CONF_ENTITIES, STORAGE_KEY, STORAGE_VERSION,
+                                                   SERVICE_INSERT_STATE, SERVICE_GET_SUMMARY)
+from custom_components.layer_manager.coordinator import get_storage_key
+
+
+async def test_entities_route_to_their_zone(hass: HomeAssistant, create_coordinator):
+    upstairs = create_coordinator({CONF_ENTITIES: {"light.bedroom": {}}}, "Upstairs")
+    downstairs = create_coordinator({CONF_ENTITIES: {"light.kitchen": {}}}, "Downstairs")
+    router = hass.data[DATA_ROUTER]
+
+    assert router.get_owner("light.bedroom") is upstairs
+    assert router.get_owner("light.kitchen") is downstairs
+    assert router.get_zone_coordinators(["light.kitchen", "light.bedroom"]) == [upstairs, downstairs]
+
+    # Unmanaged entities are only sent by the first zone a call is routed to.
+    assert router.is_fallback(downstairs, ["light.kitchen", "light.porch"])
+    assert not router.is_fallback(upstairs, ["light.kitchen", "light.porch"])
+    assert router.is_fallback(upstairs, ["light.porch"])
+
+
+async def test_first_zone_keeps_shared_entity(hass: HomeAssistant, create_coordinator):
+    first = create_coordinator({CONF_ENTITIES: {"light.hall": {}}}, "First")
+    create_coordinator({CONF_ENTITIES: {"light.hall": {}}}, "Second")
+
+    assert hass.data[DATA_ROUTER].get_owner("light.hall") is first
+
+
+async def test_targets_are_resolved_once(hass: HomeAssistant, create_coordinator):
+    hass.states.async_set("group.all", "on", {"entity_id": ["light.bedroom", "light.kitchen", "light.porch"]})
+    upstairs = create_coordinator({CONF_ENTITIES: {"light.bedroom": {}}}, "Upstairs")
+    downstairs = create_coordinator({CONF_ENTITIES: {"light.kitchen": {}}}, "Downstairs")
+    hass.data[DATA_ROUTER].async_setup_services()
+
+    with patch.object(upstairs, SERVICE_INSERT_STATE, AsyncMock()) as upstairs_insert, \
+            patch.object(downstairs, SERVICE_INSERT_STATE, AsyncMock()) as downstairs_insert:
+        await hass.services.async_call(DOMAIN, SERVICE_INSERT_STATE,
+                                       {"entity_id": "group.all", "id": "evening", "priority": 1}, blocking=True)
+
+    targets = ["light.bedroom", "light.kitchen", "light.porch"]
+    assert upstairs_insert.call_args.args[1] == targets
+    assert downstairs_insert.call_args.args[1] == targets
+
+
+async def test_summary_has_the_same_shape_for_every_zone(hass: HomeAssistant, create_coordinator):
+    create_coordinator({CONF_ENTITIES: {"light.bedroom": {}}}, "Upstairs")
+    downstairs = create_coordinator({CONF_ENTITIES: {"light.kitchen": {}}}, "Downstairs")
+    hass.data[DATA_ROUTER].async_setup_services()
+
+    summary = await hass.services.async_call(DOMAIN, SERVICE_GET_SUMMARY, {"entity_id": "light.kitchen"},
+                                             blocking=True, return_response=True)
+
+    assert summary == downstairs.get_summary()
+
+
+async def test_migrate_store_to_entry(hass: HomeAssistant, hass_storage):
+    hass_storage[STORAGE_KEY] = {"version": STORAGE_VERSION, "key": STORAGE_KEY, "data": {"states": {}}}
+    config = MockConfigEntry(domain=DOMAIN, version=1, minor_version=1)
+    config.add_to_hass(hass)
+
+    assert await async_migrate_entry(hass, config)
+
+    assert STORAGE_KEY not in hass_storage
+    assert hass_storage[get_storage_key(config.entry_id)]["data"] == {"states": {}}
+    assert config.minor_version == 2
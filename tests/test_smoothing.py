@@ -0,0 +1,73 @@
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.layer_manager.const import (CONF_ADAPTIVE, CONF_ENTITIES, CONF_INPUT_SMOOTHING,
+                                                   CONF_INPUT_SMOOTHING_WINDOW, CONF_INPUT_MIN_INTERVAL,
+                                                   CONF_MIN_BRIGHTNESS, SMOOTHING_EMA, SMOOTHING_MEDIAN,
+                                                   SMOOTHING_NONE)
+from custom_components.layer_manager.smoothing import InputSmoother, apply_bound_hysteresis
+
+
+def test_no_smoothing_uses_latest_sample():
+    smoother = InputSmoother(SMOOTHING_NONE, 5, 0)
+    assert smoother.value is None
+
+    for value in (10, 500, 20):
+        smoother.add(value)
+    assert smoother.value == 20
+
+
+def test_median_rejects_spikes():
+    smoother = InputSmoother(SMOOTHING_MEDIAN, 3, 0)
+    for value in (10, 500, 20, 30):
+        smoother.add(value)
+
+    # Only the last three samples are kept.
+    assert smoother.value == 30
+
+
+def test_ema():
+    smoother = InputSmoother(SMOOTHING_EMA, 3, 0)
+    smoother.add(100)
+    smoother.add(200)
+
+    assert smoother.value == pytest.approx(150)
+
+
+def test_debounce_delay():
+    smoother = InputSmoother(SMOOTHING_NONE, 1, 2.0)
+    assert smoother.get_delay(10.0) == 0.0
+
+    smoother.mark_updated(10.0)
+    assert smoother.get_delay(10.5) == pytest.approx(1.5)
+    assert smoother.get_delay(13.0) == 0.0
+
+
+def test_bound_hysteresis():
+    # Values are clamped without a previous value.
+    assert apply_bound_hysteresis(-5, None, 0, 100, 10) == 0
+    # Leaving the lower bound needs more than the hysteresis.
+    assert apply_bound_hysteresis(5, 0, 0, 100, 10) == 0
+    assert apply_bound_hysteresis(15, 0, 0, 100, 10) == 15
+    # Same for the upper bound.
+    assert apply_bound_hysteresis(95, 100, 0, 100, 10) == 100
+    assert apply_bound_hysteresis(85, 100, 0, 100, 10) == 85
+    # Inside the range the input passes through.
+    assert apply_bound_hysteresis(50, 40, 0, 100, 10) == 50
+
+
+async def test_smoothers_survive_unrelated_option_changes(hass: HomeAssistant, create_coordinator):
+    adaptive_opts = {CONF_INPUT_SMOOTHING: SMOOTHING_MEDIAN, CONF_INPUT_SMOOTHING_WINDOW: 3}
+    coordinator = create_coordinator({CONF_ENTITIES: {"light.a": {}}, CONF_ADAPTIVE: adaptive_opts})
+    coordinator._get_input_smoother("sensor.lux").add(100)
+
+    hass.config_entries.async_update_entry(
+        coordinator.config, options={**coordinator.config.options, CONF_ADAPTIVE: {**adaptive_opts, CONF_MIN_BRIGHTNESS: 10}})
+    coordinator._load_options()
+    assert coordinator._input_smoothers["sensor.lux"].value == 100
+
+    hass.config_entries.async_update_entry(
+        coordinator.config, options={**coordinator.config.options, CONF_ADAPTIVE: {**adaptive_opts, CONF_INPUT_MIN_INTERVAL: 5}})
+    coordinator._load_options()
+    assert "sensor.lux" not in coordinator._input_smoothers
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from custom_components.layer_manager.const import CONF_ADAPTIVE, CONF_ENTITIES, CONF_SOLAR_SCHEDULE
+
+
+async def test_superseded_schedule_is_not_installed(hass: HomeAssistant, create_coordinator):
+    coordinator = create_coordinator({CONF_ENTITIES: {}, CONF_ADAPTIVE: {CONF_SOLAR_SCHEDULE: True}})
+    now = dt_util.utcnow()
+    release = asyncio.Event()
+
+    async def compute(*args):
+        await release.wait()
+        return [(now, 0.5), (now + timedelta(hours=1), 0.6)]
+
+    with patch.object(hass, "async_add_executor_job", side_effect=compute):
+        task = hass.async_create_task(coordinator._async_setup_solar_schedule())
+        await asyncio.sleep(0)
+
+        # The schedule is cancelled while it is still being computed.
+        coordinator._cancel_solar_schedule()
+        release.set()
+        await task
+
+    assert coordinator._solar_schedule == []
+    assert coordinator._unsub_solar_schedule is None
+
+
+async def test_current_schedule_is_installed(hass: HomeAssistant, create_coordinator):
+    coordinator = create_coordinator({CONF_ENTITIES: {}, CONF_ADAPTIVE: {CONF_SOLAR_SCHEDULE: True}})
+    now = dt_util.utcnow()
+
+    async def compute(*args):
+        return [(now, 0.5), (now + timedelta(hours=1), 0.6)]
+
+    with patch.object(hass, "async_add_executor_job", side_effect=compute):
+        await coordinator._async_setup_solar_schedule()
+
+    assert coordinator._solar_schedule == [(now + timedelta(hours=1), 0.6)]
+    assert coordinator._adaptive_color_temp_factor == 0.5
+    coordinator._cancel_solar_schedule()
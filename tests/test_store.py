@@ -0,0 +1,49 @@
+from homeassistant.const import ATTR_STATE
+from homeassistant.core import HomeAssistant, State
+
+from custom_components.layer_manager.const import (ATTR_INSERTED, ATTR_PRIORITY, ATTR_EXCLUDED,
+                                                   CONF_ENTITIES, STORAGE_VERSION)
+from custom_components.layer_manager.coordinator import get_storage_key, serialize_layer_state
+
+
+async def load_coordinator(hass: HomeAssistant, hass_storage, create_coordinator, data):
+    coordinator = create_coordinator({CONF_ENTITIES: {"light.a": {}, "light.b": {}}})
+    key = get_storage_key(coordinator.config.entry_id)
+    hass_storage[key] = {"version": STORAGE_VERSION, "key": key, "data": data}
+    await coordinator.async_load_from_store()
+    return coordinator
+
+
+async def test_stored_layers_materialize_on_use(hass: HomeAssistant, hass_storage, create_coordinator):
+    stored_state = {"entity_id": "light.a", "state": "on", "attributes": {"brightness": 128}}
+    coordinator = await load_coordinator(hass, hass_storage, create_coordinator, {"states": {"light.a": {
+        "evening": {ATTR_PRIORITY: 5, ATTR_STATE: stored_state, ATTR_INSERTED: 1.0},
+        "night": {ATTR_PRIORITY: 1, ATTR_STATE: {**stored_state, "state": "off"}, ATTR_INSERTED: 2.0}
+    }}})
+    layers = coordinator.entity_states["light.a"]
+
+    # Nothing is built while loading.
+    assert all(isinstance(data[ATTR_STATE], dict) for data in layers.values())
+
+    state = coordinator._get_layer_state(layers["evening"], "light.a")
+    assert isinstance(state, State)
+    assert state.attributes["brightness"] == 128
+    assert layers["evening"][ATTR_STATE] is state
+    assert isinstance(layers["night"][ATTR_STATE], dict)
+
+    # Layers that were never used are saved as they were loaded.
+    assert serialize_layer_state(layers["night"][ATTR_STATE]) == {**stored_state, "state": "off"}
+    assert serialize_layer_state(state) == stored_state
+
+
+async def test_stored_group_layers_keep_the_group(hass: HomeAssistant, hass_storage, create_coordinator):
+    hass.states.async_set("group.lights", "on", {"entity_id": ["light.a", "light.b"]})
+    coordinator = await load_coordinator(hass, hass_storage, create_coordinator, {"group_states": {"group.lights": {
+        "evening": {ATTR_PRIORITY: 5, ATTR_STATE: {"state": "on", "attributes": {}}, ATTR_INSERTED: 1.0,
+                    ATTR_EXCLUDED: ["light.b"]}
+    }}})
+
+    layers = coordinator.get_layers("light.a")[0]["layers"]
+    assert layers[0]["layer_id"] == "evening"
+    assert layers[0]["group"] == "group.lights"
+    assert coordinator.get_layers("light.b")[0]["layers"] == []
@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from homeassistant.components.scene import DATA_COMPONENT as DATA_HA_SCENE
+from homeassistant.core import HomeAssistant, ServiceCall, State
+
+from custom_components.layer_manager.const import DOMAIN, SERVICE_INSERT_SCENE
+from custom_components.layer_manager.trace import RECORD_CALL, RECORD_SCENE, TraceRecorder
+
+
+async def test_scene_is_recorded_before_its_first_call(hass: HomeAssistant):
+    scene_component = MagicMock()
+    scene_component.get_entity.return_value = SimpleNamespace(
+        scene_config=SimpleNamespace(states={"light.a": State("light.a", "on")}))
+    hass.data[DATA_HA_SCENE] = scene_component
+
+    recorder = TraceRecorder(hass)
+    recorder.start({}, [])
+    call = ServiceCall(hass, DOMAIN, SERVICE_INSERT_SCENE, {"entity_id": "scene.evening", "id": "evening", "priority": 1})
+    recorder.record_call(call)
+    recorder.record_call(call)
+
+    assert [record[1] for record in recorder._records] == [RECORD_SCENE, RECORD_CALL, RECORD_CALL]
+    assert recorder._records[0][2] == "scene.evening"
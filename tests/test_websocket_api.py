@@ -0,0 +1,75 @@
+from homeassistant.core import HomeAssistant, State
+from homeassistant.setup import async_setup_component
+
+from custom_components.layer_manager import websocket_api
+from custom_components.layer_manager.const import DOMAIN, CONF_ENTITIES, WS_TYPE_LAYERS, WS_TYPE_SUBSCRIBE
+
+
+async def setup_websocket(hass: HomeAssistant, create_coordinator):
+    assert await async_setup_component(hass, "websocket_api", {})
+    websocket_api.async_setup(hass)
+    coordinator = create_coordinator({CONF_ENTITIES: {"light.a": {}, "light.b": {}}})
+    hass.data.setdefault(DOMAIN, {})[coordinator.config.entry_id] = coordinator
+    return coordinator
+
+
+async def test_layers_query(hass: HomeAssistant, hass_ws_client, create_coordinator):
+    coordinator = await setup_websocket(hass, create_coordinator)
+    coordinator._set_layer("light.a", "evening", 5, State("light.a", "on", {"brightness": 100}))
+    client = await hass_ws_client(hass)
+
+    await client.send_json({"id": 1, "type": WS_TYPE_LAYERS, "entity_id": "light.a"})
+    response = await client.receive_json()
+
+    assert response["success"]
+    entity = response["result"]["entities"][0]
+    assert entity["active_layer"] == "evening"
+    assert entity["layers"][0]["attributes"] == {"brightness": 100}
+
+
+async def test_subscribe_sends_snapshot_and_deltas(hass: HomeAssistant, hass_ws_client, create_coordinator):
+    coordinator = await setup_websocket(hass, create_coordinator)
+    client = await hass_ws_client(hass)
+
+    await client.send_json({"id": 1, "type": WS_TYPE_SUBSCRIBE, "entity_id": "light.a"})
+    assert (await client.receive_json())["success"]
+    snapshot = await client.receive_json()
+    assert snapshot["event"]["snapshot"][0]["layers"] == []
+
+    # Deltas for other entities are filtered out, the rest of a mutation arrives as one message.
+    coordinator._set_layer("light.b", "movie", 1, State("light.b", "on"))
+    coordinator._set_layer("light.a", "evening", 5, State("light.a", "on"))
+    coordinator._pop_layer("light.a", "evening")
+    event = await client.receive_json()
+
+    assert [(delta["type"], delta["layer_id"]) for delta in event["event"]["deltas"]] == [
+        ("layer_added", "evening"), ("layer_removed", "evening")]
+
+
+async def test_layers_query_by_layer_id(hass: HomeAssistant, hass_ws_client, create_coordinator):
+    coordinator = await setup_websocket(hass, create_coordinator)
+    coordinator._set_layer("light.a", "evening", 5, State("light.a", "on"))
+    coordinator._set_layer("light.b", "movie", 5, State("light.b", "on"))
+    client = await hass_ws_client(hass)
+
+    await client.send_json({"id": 1, "type": WS_TYPE_LAYERS, "layer_id": "movie"})
+    response = await client.receive_json()
+
+    assert [entity["entity_id"] for entity in response["result"]["entities"]] == ["light.b"]
+
+
+async def test_subscribe_to_member_receives_group_deltas(hass: HomeAssistant, hass_ws_client, create_coordinator):
+    hass.states.async_set("group.lights", "on", {"entity_id": ["light.a", "light.b"]})
+    coordinator = await setup_websocket(hass, create_coordinator)
+    client = await hass_ws_client(hass)
+
+    await client.send_json({"id": 1, "type": WS_TYPE_SUBSCRIBE, "entity_id": "light.a"})
+    assert (await client.receive_json())["success"]
+    await client.receive_json()
+
+    coordinator._set_group_layer("group.lights", "evening", 5, State("group.lights", "on"))
+    coordinator._pop_group_layer("group.lights", "evening")
+    event = await client.receive_json()
+
+    assert [(delta["type"], delta["entity_id"]) for delta in event["event"]["deltas"]] == [
+        ("layer_added", "group.lights"), ("layer_removed", "group.lights")]